@@ -1,3 +1,4 @@
+import math
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
@@ -7,63 +8,153 @@ from ipywidgets import interact, FloatSlider
 omega = 1e6  # Angular frequency (rad/s)
 t = 0.0      # Fixed time (you can adjust or animate this if desired)
 
+# Grid resolution (rho, phi, z); the slider only rescales precomputed arrows, so much denser grids stay usable.
+# For in-place redraws in Jupyter use an interactive backend (%matplotlib widget).
+GRID_SIZE = (10, 36, 20)
+ARROW_LENGTH = 0.5
+ARROW_LENGTH_RATIO = 0.3  # Arrow head size as in Axes3D.quiver; 0 draws shafts only (fewer vertices)
+
+# All arrows of a field are drawn as one NaN-separated polyline; Agg rasterises long paths faster in chunks.
+plt.rcParams['agg.path.chunksize'] = 1000
+
+
 # Create a 3D cylindrical grid
-rho = np.linspace(0.5, 1.5, 10)  # Radial distance (avoid rho=0 to prevent division by zero)
-phi = np.linspace(0, 2*np.pi, 36)  # Azimuthal angle
-z = np.linspace(-1, 1, 20)         # Axial direction
-Rho, Phi, Z = np.meshgrid(rho, phi, z, indexing='ij')
+def make_grid(n_rho=10, n_phi=36, n_z=20):
+    """
+    Cylindrical grid and the geometry-dependent terms of the fields, computed once.
+
+    Returns:
+    - dict with the 1-D 'z' axis, 'inv_rho' (1/Rho), 'sin_phi', 'cos_phi' and the Cartesian 'xyz' points
+      (n, 3), all meshgrid arrays flattened in the same (rho, phi, z) order.
+    """
+    rho = np.linspace(0.5, 1.5, n_rho)  # Radial distance (avoid rho=0 to prevent division by zero)
+    phi = np.linspace(0, 2*np.pi, n_phi)  # Azimuthal angle
+    z = np.linspace(-1, 1, n_z)         # Axial direction
+    Rho, Phi, Z = np.meshgrid(rho, phi, z, indexing='ij')
+
+    # Convert cylindrical to Cartesian coordinates for plotting
+    sin_phi, cos_phi = np.sin(Phi), np.cos(Phi)
+    X = Rho * cos_phi
+    Y = Rho * sin_phi
+    return {
+        'z': z,
+        'inv_rho': (1 / Rho).ravel(),
+        'sin_phi': sin_phi.ravel(),
+        'cos_phi': cos_phi.ravel(),
+        'xyz': np.column_stack([X.ravel(), Y.ravel(), Z.ravel()]),
+    }
+
+
+def arrow_offsets(directions, length=ARROW_LENGTH, arrow_length_ratio=ARROW_LENGTH_RATIO):
+    """
+    Vertices of Axes3D.quiver arrows (pivot='tail') for unit directions, relative to the arrow tails.
+
+    Quiver lines scale linearly with the vector (a negative vector gives the mirrored arrow), so the arrows
+    of a field a * directions are tails + a * offsets.
+
+    Returns:
+    - (n, k, 3) array: one polyline per arrow (tail, tip, head, tip, head, or just tail, tip if
+      arrow_length_ratio is 0) followed by a NaN vertex that breaks the line before the next arrow.
+    """
+    tip = length * directions
+    gap = np.full_like(directions, np.nan)
+    if not arrow_length_ratio:
+        return np.stack([np.zeros_like(directions), tip, gap], axis=1)
+
+    # Head directions: the shaft direction rotated by +-15 degrees (same construction as Axes3D.quiver)
+    x, y = directions[:, 0], directions[:, 1]
+    norm = np.linalg.norm(directions[:, :2], axis=1)
+    x_p = np.divide(y, norm, where=norm != 0, out=np.zeros_like(x))
+    y_p = np.divide(-x, norm, where=norm != 0, out=np.ones_like(x))
+    c, s = math.cos(math.radians(15)), math.sin(math.radians(15))
+    r13, r32, r12 = y_p * s, x_p * s, x_p * y_p * (1 - c)
+    Rpos = np.array([[c + x_p ** 2 * (1 - c), r12, r13],
+                     [r12, c + y_p ** 2 * (1 - c), -r32],
+                     [-r13, r32, np.full_like(x_p, c)]])
+    Rneg = Rpos.copy()
+    Rneg[[0, 1, 2, 2], [2, 2, 0, 1]] *= -1
+    head_pos, head_neg = (tip - length * arrow_length_ratio * np.einsum("ij...,...j->...i", R, directions)
+                          for R in (Rpos, Rneg))
+    return np.stack([np.zeros_like(directions), tip, head_pos, tip, head_neg, gap], axis=1)
+
+
+class FieldExplorer:
+    """
+    E/H field figure whose arrows are updated in place (one line artist per field); update() only
+    recomputes the field amplitudes.
+
+    E_phi = (50 / Rho) * cos(omega*t + beta*Z) and H_rho = (H0 / Rho) * cos(omega*t + beta*Z), so H0 and beta
+    only scale each fixed-direction arrow (phi-hat for E, rho-hat for H): the arrows are tails + a * offsets
+    with the offsets precomputed for unit vectors.
+    """
+
+    def __init__(self, grid_size=GRID_SIZE, normalize=True, length=ARROW_LENGTH,
+                 arrow_length_ratio=ARROW_LENGTH_RATIO):
+        self.grid = make_grid(*grid_size)
+        self.normalize = normalize
+        sin_phi, cos_phi = self.grid['sin_phi'], self.grid['cos_phi']
+        zeros = np.zeros_like(sin_phi)
+        # phi-direction: (-sin(phi), cos(phi), 0), rho-direction: (cos(phi), sin(phi), 0)
+        e_offsets = arrow_offsets(np.column_stack([-sin_phi, cos_phi, zeros]), length, arrow_length_ratio)
+        h_offsets = arrow_offsets(np.column_stack([cos_phi, sin_phi, zeros]), length, arrow_length_ratio)
+        self.tails = self.grid['xyz'][:, None, :]
+        self.offsets = {'E': e_offsets, 'H': h_offsets}
+        self.fig = None
+
+    def _build_figure(self):
+        # Create a 3D plot
+        self.fig = plt.figure(figsize=(12, 6))
+        self.axes = {}
+        self.lines = {}
+        for position, (name, color) in zip((121, 122), (('E', 'b'), ('H', 'r'))):
+            ax = self.fig.add_subplot(position, projection='3d')
+            ax.set_xlabel('X')
+            ax.set_ylabel('Y')
+            ax.set_zlabel('Z')
+            ax.set_xlim(-2, 2)
+            ax.set_ylim(-2, 2)
+            ax.set_zlim(-1, 1)
+            self.lines[name], = ax.plot([], [], [], color=color)
+            self.axes[name] = ax
+        self.fig.tight_layout()
+
+    def amplitudes(self, H0, beta):
+        """E_phi and H_rho at every grid point (flattened), by broadcasting the z-only phase term."""
+        n_z = len(self.grid['z'])
+        phase = np.cos(omega * t + beta * self.grid['z'])
+        wave = np.broadcast_to(phase, (len(self.grid['inv_rho']) // n_z, n_z)).ravel()
+        E_phi = 50 * self.grid['inv_rho'] * wave  # E in phi-direction
+        H_rho = H0 * self.grid['inv_rho'] * wave  # H in rho-direction
+        return E_phi, H_rho
+
+    def update(self, H0=1.0, beta=1.0):
+        if self.fig is None or not plt.fignum_exists(self.fig.number):
+            self._build_figure()  # first call, or the inline backend closed the last figure
+        E_phi, H_rho = self.amplitudes(H0, beta)
+        for name, amplitude in (('E', E_phi), ('H', H_rho)):
+            # normalize=True like quiver(..., normalize=True): only the sign of each arrow changes
+            scale = np.sign(amplitude) if self.normalize else amplitude
+            vertices = (self.tails + scale[:, None, None] * self.offsets[name]).reshape(-1, 3)
+            self.lines[name].set_data_3d(vertices[:, 0], vertices[:, 1], vertices[:, 2])
+            self.axes[name].set_title(f'{name}-field (H0={H0}, β={beta})')
+        self.fig.canvas.draw_idle()
+        if 'inline' in plt.get_backend():
+            plt.show()  # static backends need the figure shown again
+
+
+explorer = None
 
-# Convert cylindrical to Cartesian coordinates for plotting
-X = Rho * np.cos(Phi)
-Y = Rho * np.sin(Phi)
-Z = Z
 
 # Function to plot the fields with adjustable H0 and beta
 def plot_fields(H0=1.0, beta=1.0):
-    # Compute E and H in cylindrical coordinates
-    E_phi = (50 / Rho) * np.cos(omega * t + beta * Z)  # E in phi-direction
-    H_rho = (H0 / Rho) * np.cos(omega * t + beta * Z)  # H in rho-direction
-
-    # Convert to Cartesian components
-    # phi-direction: (-sin(phi), cos(phi), 0)
-    # rho-direction: (cos(phi), sin(phi), 0)
-    E_x = -E_phi * np.sin(Phi)
-    E_y = E_phi * np.cos(Phi)
-    E_z = np.zeros_like(E_x)  # No z-component for E
-
-    H_x = H_rho * np.cos(Phi)
-    H_y = H_rho * np.sin(Phi)
-    H_z = np.zeros_like(H_x)  # No z-component for H
-
-    # Create a 3D plot
-    fig = plt.figure(figsize=(12, 6))
-
-    # Plot E-field
-    ax1 = fig.add_subplot(121, projection='3d')
-    ax1.quiver(X, Y, Z, E_x, E_y, E_z, color='b', length=0.5, normalize=True)
-    ax1.set_title(f'E-field (H0={H0}, β={beta})')
-    ax1.set_xlabel('X')
-    ax1.set_ylabel('Y')
-    ax1.set_zlabel('Z')
-    ax1.set_xlim(-2, 2)
-    ax1.set_ylim(-2, 2)
-    ax1.set_zlim(-1, 1)
-
-    # Plot H-field
-    ax2 = fig.add_subplot(122, projection='3d')
-    ax2.quiver(X, Y, Z, H_x, H_y, H_z, color='r', length=0.5, normalize=True)
-    ax2.set_title(f'H-field (H0={H0}, β={beta})')
-    ax2.set_xlabel('X')
-    ax2.set_ylabel('Y')
-    ax2.set_zlabel('Z')
-    ax2.set_xlim(-2, 2)
-    ax2.set_ylim(-2, 2)
-    ax2.set_zlim(-1, 1)
-
-    plt.tight_layout()
-    plt.show()
-
-# Create interactive sliders for H0 and beta
-interact(plot_fields,
-         H0=FloatSlider(min=0.1, max=5.0, step=0.1, value=1.0, description='H0'),
-         beta=FloatSlider(min=0.1, max=5.0, step=0.1, value=1.0, description='β'))
\ No newline at end of file
+    global explorer
+    if explorer is None:
+        explorer = FieldExplorer(GRID_SIZE)
+    explorer.update(H0, beta)
+
+
+if __name__ == "__main__":
+    # Create interactive sliders for H0 and beta
+    interact(plot_fields,
+             H0=FloatSlider(min=0.1, max=5.0, step=0.1, value=1.0, description='H0'),
+             beta=FloatSlider(min=0.1, max=5.0, step=0.1, value=1.0, description='β'))
@@ -1,6 +1,8 @@
 import asyncio
 import sys
+import argparse
 from bleak import BleakClient, BleakScanner
+from ble_replay import ReplayClient
 
 # BLE UUIDs (same as in the Arduino sketch)
 SERVICE_UUID = "19B10000-E8F2-537E-4F6C-D104768A1214"
@@ -14,35 +16,47 @@ def notification_handler(sender, data):
     print(data_str)  # Print to stdout (this will be piped to edge-impulse-data-forwarder)
 
 
-async def main():
-    # Scan for the Arduino device
-    print("Scanning for Nano33BLE...")
-    devices = await BleakScanner.discover()
-    target_device = None
-    for device in devices:
-        if device.name == "Nano33BLE":
-            target_device = device
-            break
+async def main(replay=None, speed=1.0):
+    if replay:
+        # Play back a recorded session instead of connecting to the board
+        client = ReplayClient(replay, speed=speed)
+    else:
+        # Scan for the Arduino device
+        print("Scanning for Nano33BLE...")
+        devices = await BleakScanner.discover()
+        target_device = None
+        for device in devices:
+            if device.name == "Nano33BLE":
+                target_device = device
+                break
 
-    if not target_device:
-        print("Could not find Nano33BLE device")
-        sys.exit(1)
+        if not target_device:
+            print("Could not find Nano33BLE device")
+            sys.exit(1)
 
-    print(f"Found Nano33BLE at {target_device.address}")
+        print(f"Found Nano33BLE at {target_device.address}")
+        client = BleakClient(target_device.address)
 
     # Connect to the device
-    async with BleakClient(target_device.address) as client:
+    async with client:
         print("Connected to Nano33BLE")
 
         # Start notifications for the characteristic
         await client.start_notify(CHARACTERISTIC_UUID, notification_handler)
         print("Subscribed to accelerometer data")
 
-        # Keep the connection alive indefinitely (stop with Ctrl+C)
-        while True:
+        # Keep the connection alive until it drops or the replay ends (stop with Ctrl+C)
+        while client.is_connected:
             await asyncio.sleep(1)
 
+    if replay:
+        print(f"Replay: {client.summary()}", file=sys.stderr)
+
 
 # Run the script
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Forward Nano33BLE notifications to stdout")
+    parser.add_argument("--replay", default=None, help="Replay this session CSV instead of connecting to the board")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (1 = real time, 0 = as fast as possible)")
+    args = parser.parse_args()
+    asyncio.run(main(args.replay, args.speed))
\ No newline at end of file
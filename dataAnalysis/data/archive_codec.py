@@ -0,0 +1,355 @@
+import os
+import sys
+import json
+import lzma
+import zlib
+import time
+import struct
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+from session_io import HEADER_PREFIX, parse_session_text, list_session_files
+
+# Lossless cold-storage codec for raw IMU recordings (Timestamp,X,Y,Z CSVs from ble_receiver / the app).
+#
+# rep_tracker.ino sends two decimals, so every value is stored as int16 in 0.01 m/s² steps; timestamps are
+# stored in microseconds as a base time, a nominal sample interval and, per sample, the residual of the
+# actual interval against the nominal one (a delta-of-delta against the nominal rate, which is near zero
+# apart from BLE jitter). Samples are split into chunks; each chunk carries its own first timestamp and
+# first values, so it decodes independently. Within a chunk each axis is delta- or XOR-encoded (whichever
+# compresses better), zigzag-mapped, split into byte planes and entropy coded (lzma or zlib).
+#
+# The title line, the header and the trailing "Reps and Sets Summary" section are kept verbatim and values
+# are re-printed the way the app wrote them, so `unpack` restores the original CSV byte for byte ('exact' in
+# the pack report; -0.0 values are kept as exceptions).
+#
+#   python archive_codec.py pack Raw_data --out archive/        # Raw_data/X.csv -> archive/X.rta
+#   python archive_codec.py unpack archive/X.rta --out X.csv
+#   python archive_codec.py bench Raw_data                       # size and decode time vs CSV parsing
+#
+#   for timestamps, xyz in iter_blocks("archive/X.rta"):        # streaming decode, one chunk at a time
+#       ...
+
+ARCHIVE_SUFFIX = '.rta'
+MAGIC = b'RTA1'
+SCALE = 100  # 0.01 m/s² resolution
+CHUNK_SIZE = 4096  # samples per chunk
+COLUMNS = ['X', 'Y', 'Z']
+CODECS = {
+    'lzma': (lambda data: lzma.compress(data, preset=9), lzma.decompress),
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+}
+
+# Chunk header: rows, payload bytes, first timestamp (us from base), first X/Y/Z, XOR flags (bit per axis),
+# number of -0.0 exceptions
+_CHUNK = struct.Struct('<IIqhhhBI')
+_LENGTH = struct.Struct('<I')
+
+
+def _zigzag(values, bits):
+    return (values << 1) ^ (values >> (bits - 1))
+
+
+def _unzigzag(values):
+    """Inverse of _zigzag on the unsigned representation (view the result as the signed type)."""
+    return (values >> 1) ^ (0 - (values & 1)).astype(values.dtype)
+
+
+def _planes(values):
+    """Byte planes of an integer array (all low bytes, then the next byte, ...)."""
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+
+def _from_planes(data, dtype, count):
+    dtype = np.dtype(dtype)
+    planes = np.frombuffer(data, dtype=np.uint8, count=count * dtype.itemsize).reshape(dtype.itemsize, count)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+
+def _encode_axis(values):
+    """Delta or XOR encoding of one int16 axis (without its first value), whichever compresses better."""
+    delta = _zigzag(np.diff(values), 16).astype(np.uint16)
+    xor = (values[1:] ^ values[:-1]).view(np.uint16)
+    delta_bytes, xor_bytes = _planes(delta), _planes(xor)
+    if len(zlib.compress(xor_bytes, 1)) < len(zlib.compress(delta_bytes, 1)):
+        return True, xor_bytes
+    return False, delta_bytes
+
+
+def _decode_axis(first, encoded, is_xor):
+    if is_xor:
+        return np.bitwise_xor.accumulate(np.r_[np.uint16(first & 0xFFFF), encoded]).view(np.int16)
+    deltas = _unzigzag(encoded).view(np.int16)
+    return np.cumsum(np.r_[np.int16(first), deltas], dtype=np.int16)  # int16 wrap-around undoes the diff
+
+
+def encode_chunk(t_us, values, negative_zero, interval_us, compress):
+    """
+    Encodes one chunk.
+
+    Parameters:
+    - t_us: int64 timestamps, microseconds from the archive's base time.
+    - values: (n, 3) int16 samples in 0.01 m/s².
+    - negative_zero: Flat indices (row * 3 + axis) of -0.0 values within the chunk.
+    - interval_us: Nominal sample interval.
+    - compress: Entropy coder.
+    """
+    n = len(t_us)
+    residuals = _zigzag(np.diff(t_us) - interval_us, 64)
+    parts = [_planes(residuals)]
+    flags = 0
+    for axis in range(values.shape[1]):
+        is_xor, encoded = _encode_axis(np.ascontiguousarray(values[:, axis]))
+        flags |= is_xor << axis
+        parts.append(encoded)
+    parts.append(np.asarray(negative_zero, dtype='<u4').tobytes())
+    payload = compress(b''.join(parts))
+    return _CHUNK.pack(n, len(payload), int(t_us[0]), *values[0].tolist(), flags, len(negative_zero)) + payload
+
+
+def decode_chunk(header, payload, interval_us, decompress):
+    """Inverse of encode_chunk; returns (t_us, values, negative_zero)."""
+    n, _, t0, x0, y0, z0, flags, n_negative_zero = header
+    data = decompress(payload)
+    offset = 8 * (n - 1)
+    residuals = _unzigzag(_from_planes(data[:offset], '<u8', n - 1)).view(np.int64)
+    t_us = np.cumsum(np.r_[np.int64(t0), residuals + interval_us])
+    values = np.empty((n, len(COLUMNS)), dtype=np.int16)
+    for axis, first in enumerate((x0, y0, z0)):
+        encoded = _from_planes(data[offset:offset + 2 * (n - 1)], '<u2', n - 1)
+        values[:, axis] = _decode_axis(first, encoded, flags >> axis & 1)
+        offset += 2 * (n - 1)
+    negative_zero = np.frombuffer(data, dtype='<u4', count=n_negative_zero, offset=offset)
+    return t_us, values, negative_zero
+
+
+def split_session_text(text):
+    """Splits a session CSV into (prefix up to and including the header line, data lines, trailer)."""
+    start = text.find(HEADER_PREFIX)
+    if start < 0:
+        raise ValueError(f"no '{HEADER_PREFIX}' header found")
+    header_end = text.find('\n', start) + 1
+    end = text.find('\n\n', header_end)
+    end = len(text) if end < 0 else end
+    body = text[header_end:end]
+    stripped = body.rstrip('\n')
+    return text[:header_end], stripped.split('\n') if stripped else [], body[len(stripped):] + text[end:]
+
+
+def format_rows(t_us, values, negative_zero, base_time_us):
+    """Re-prints samples as the app writes them: Dart's DateTime.toIso8601String() and double.toString()."""
+    us = np.asarray(t_us, dtype=np.int64) + base_time_us
+    stamps = np.datetime_as_string(us.astype('datetime64[us]'), unit='us').astype(object)
+    whole_milliseconds = us % 1000 == 0
+    if whole_milliseconds.any():
+        stamps[whole_milliseconds] = [s[:-3] for s in stamps[whole_milliseconds]]  # Dart omits zero microseconds
+    lo, hi = int(values.min()), int(values.max())
+    table = np.array([str(v / SCALE) for v in range(lo, hi + 1)], dtype=object)
+    columns = table[values.astype(np.int64) - lo]
+    if len(negative_zero):
+        rows, axes = np.divmod(np.asarray(negative_zero, dtype=np.int64), len(COLUMNS))
+        columns[rows, axes] = '-0.0'
+    return [','.join(row) for row in zip(stamps.tolist(), *columns.T.tolist())]
+
+
+def write_archive(text, output_file, source=None, chunk_size=CHUNK_SIZE, codec='lzma'):
+    """
+    Packs the contents of a raw session CSV.
+
+    Parameters:
+    - text: CSV contents (Timestamp,X,Y,Z).
+    - output_file: Destination .rta file.
+    - source: Original file name, stored in the header.
+    - chunk_size: Samples per independently decodable chunk.
+    - codec: 'lzma' (smallest) or 'zlib' (fastest to decode).
+
+    Returns:
+    - Header dict; 'exact' tells whether unpacking reproduces `text` byte for byte.
+
+    Raises:
+    - ValueError if the file has other columns, unparseable timestamps or values that are not multiples of 0.01.
+    """
+    prefix, lines, trailer = split_session_text(text)
+    df = parse_session_text(text)
+    if list(df.columns) != ['Timestamp'] + COLUMNS:
+        raise ValueError(f"only Timestamp,X,Y,Z sessions can be archived, got {','.join(df.columns)}")
+    if df['Timestamp'].isna().any():
+        raise ValueError("unparseable timestamps")
+    if not len(df):
+        raise ValueError("no samples")
+
+    raw = df[COLUMNS].to_numpy(dtype=np.float64)
+    scaled = np.rint(raw * SCALE)
+    if np.abs(scaled).max() > np.iinfo(np.int16).max or not np.array_equal(scaled / SCALE, raw):
+        raise ValueError("values are not int16 multiples of 0.01, archiving would lose precision")
+    values = scaled.astype(np.int16)
+    negative_zero = np.flatnonzero((raw == 0) & np.signbit(raw))
+
+    us = df['Timestamp'].to_numpy(dtype='datetime64[us]').astype(np.int64)
+    base_time_us = int(us[0])
+    t_us = us - base_time_us
+    interval_us = int(np.median(np.diff(t_us))) if len(t_us) > 1 else 0
+
+    header = {
+        'source': source,
+        'columns': COLUMNS,
+        'scale': SCALE,
+        'base_time': pd.Timestamp(base_time_us, unit='us').isoformat(),
+        'base_time_us': base_time_us,
+        'interval_us': interval_us,
+        'rate_hz': 1e6 / interval_us if interval_us else None,
+        'count': len(df),
+        'chunk_size': chunk_size,
+        'codec': codec,
+        'prefix': prefix,
+        'trailer': trailer,
+    }
+    header['exact'] = len(lines) == len(df) and format_rows(t_us, values, negative_zero, base_time_us) == lines
+
+    compress = CODECS[codec][0]
+    with open(output_file, 'wb') as f:
+        encoded_header = json.dumps(header).encode('utf-8')
+        f.write(MAGIC + _LENGTH.pack(len(encoded_header)) + encoded_header)
+        for start in range(0, len(df), chunk_size):
+            end = start + chunk_size
+            chunk_negative_zero = negative_zero[(negative_zero >= start * 3) & (negative_zero < end * 3)] - start * 3
+            f.write(encode_chunk(t_us[start:end], values[start:end], chunk_negative_zero, interval_us, compress))
+    return header
+
+
+def read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a RepTracker archive")
+    (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+    return json.loads(f.read(length).decode('utf-8'))
+
+
+def iter_chunks(file_path):
+    """Yields (header, t_us, int16 values, negative_zero) per chunk, reading one chunk at a time."""
+    with open(file_path, 'rb') as f:
+        header = read_header(f)
+        decompress = CODECS[header['codec']][1]
+        while True:
+            raw_header = f.read(_CHUNK.size)
+            if not raw_header:
+                break
+            chunk_header = _CHUNK.unpack(raw_header)
+            t_us, values, negative_zero = decode_chunk(chunk_header, f.read(chunk_header[1]),
+                                                       header['interval_us'], decompress)
+            yield header, t_us, values, negative_zero
+
+
+def iter_blocks(file_path):
+    """
+    Streaming decoder.
+
+    Yields:
+    - (timestamps, xyz) per chunk: datetime64[us] array and (n, 3) float64 array in m/s².
+    """
+    for header, t_us, values, _ in iter_chunks(file_path):
+        timestamps = (t_us + header['base_time_us']).astype('datetime64[us]')
+        yield timestamps, values / header['scale']
+
+
+def read_archive(file_path):
+    """Whole archive as a DataFrame like session_io.read_session_csv (Timestamp, X, Y, Z)."""
+    blocks = list(iter_blocks(file_path))
+    if not blocks:
+        return pd.DataFrame(columns=['Timestamp'] + COLUMNS)
+    timestamps = np.concatenate([t for t, _ in blocks])
+    xyz = np.concatenate([v for _, v in blocks])
+    return pd.DataFrame({'Timestamp': timestamps, 'X': xyz[:, 0], 'Y': xyz[:, 1], 'Z': xyz[:, 2]})
+
+
+def restore_text(file_path):
+    """Rebuilds the original CSV text (identical to it when the archive header says 'exact')."""
+    lines = []
+    header = None
+    for header, t_us, values, negative_zero in iter_chunks(file_path):
+        lines += format_rows(t_us, values, negative_zero, header['base_time_us'])
+    if header is None:
+        with open(file_path, 'rb') as f:
+            header = read_header(f)
+    return header['prefix'] + '\n'.join(lines) + header['trailer']
+
+
+def pack_files(files, output_dir, codec='lzma', chunk_size=CHUNK_SIZE):
+    """Archives every raw session in files; sessions that cannot be archived losslessly are reported and skipped."""
+    os.makedirs(output_dir, exist_ok=True)
+    total_in = total_out = 0
+    for file_path in files:
+        with open(file_path, 'r', newline='') as f:
+            text = f.read()
+        output_file = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0] + ARCHIVE_SUFFIX)
+        try:
+            header = write_archive(text, output_file, os.path.basename(file_path), chunk_size, codec)
+        except ValueError as e:
+            print(f"Skipped {file_path}: {e}", file=sys.stderr)
+            continue
+        size_in, size_out = len(text.encode('utf-8')), os.path.getsize(output_file)
+        total_in += size_in
+        total_out += size_out
+        print(f"{file_path}: {header['count']} samples, {size_in} -> {size_out} bytes "
+              f"({size_in / size_out:.1f}x){'' if header['exact'] else ', values only (text differs)'}")
+    if total_out:
+        print(f"Total: {total_in} -> {total_out} bytes ({total_in / total_out:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lossless archive codec for raw IMU sessions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser("pack", help="Archive raw session CSVs")
+    pack.add_argument("paths", nargs="+", help="Raw session CSVs or directories")
+    pack.add_argument("--out", default="archive", help="Output directory")
+    pack.add_argument("--codec", choices=sorted(CODECS), default="lzma")
+    pack.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Samples per chunk")
+
+    unpack = commands.add_parser("unpack", help="Restore the CSV of an archive")
+    unpack.add_argument("archive", help=f"{ARCHIVE_SUFFIX} file")
+    unpack.add_argument("--out", default=None, help="Output CSV (default: the original file name)")
+    unpack.add_argument("--force", action="store_true", help="Overwrite the output CSV if it exists")
+
+    bench = commands.add_parser("bench", help="Compare archive size and decode time with CSV parsing")
+    bench.add_argument("paths", nargs="+", help="Raw session CSVs or directories")
+    bench.add_argument("--codec", choices=sorted(CODECS), default="lzma")
+
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        pack_files(list_session_files(args.paths), args.out, args.codec, args.chunk_size)
+    elif args.command == "unpack":
+        with open(args.archive, 'rb') as f:
+            source = read_header(f)['source']
+        output_file = args.out or source or os.path.splitext(args.archive)[0] + '.csv'
+        if os.path.exists(output_file) and not args.force:
+            parser.error(f"{output_file} exists (e.g. the original CSV); pass --out or --force")
+        with open(output_file, 'w' if args.force else 'x', newline='') as f:
+            f.write(restore_text(args.archive))
+        print(f"Restored {output_file}")
+    else:
+        csv_time = decode_time = 0.0
+        size_in = size_out = 0
+        handle, output_file = tempfile.mkstemp(suffix=ARCHIVE_SUFFIX)
+        os.close(handle)
+        for file_path in list_session_files(args.paths):
+            with open(file_path, 'r', newline='') as f:
+                text = f.read()
+            start = time.perf_counter()
+            parse_session_text(text)
+            csv_time += time.perf_counter() - start
+            try:
+                write_archive(text, output_file, codec=args.codec)
+                start = time.perf_counter()
+                read_archive(output_file)
+                decode_time += time.perf_counter() - start
+                size_in += len(text.encode('utf-8'))
+                size_out += os.path.getsize(output_file)
+            except ValueError as e:
+                print(f"Skipped {file_path}: {e}", file=sys.stderr)
+        os.remove(output_file)
+        print(f"CSV: {size_in} bytes, parsed in {csv_time:.3f}s")
+        print(f"Archive ({args.codec}): {size_out} bytes ({size_in / max(size_out, 1):.1f}x), "
+              f"decoded in {decode_time:.3f}s")
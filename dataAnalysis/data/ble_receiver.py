@@ -2,13 +2,13 @@ import asyncio
 import sys
 import requests
 import argparse
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from bleak import BleakClient, BleakScanner
-
-# Edge Impulse API settings
-API_KEY = "ei_a0bb646faa68dd8fcd5b57a33dc11f9ee85ae9283cb82a66ef855477e05b7e2c"  # Replace with your full API key
-PROJECT_ID = "149805"  # Replace with your project ID
-INGESTION_URL = "https://ingestion.edgeimpulse.com/api/training/data"
+from ingest_metrics import IngestMetrics, start_metrics_server
+from edge_impulse import INGESTION_URL, build_payload, build_headers
+from ble_replay import ReplayClient
 
 # BLE UUIDs
 SERVICE_UUID = "19B10000-E8F2-537E-4F6C-D104768A1214"
@@ -23,36 +23,49 @@ SAMPLES_PER_REQUEST = SAMPLE_DURATION_MS // (1000 // SAMPLE_RATE_HZ)  # 500 samp
 data_buffer = []
 sample_count = 0
 
-# Parse command-line arguments for the label
-parser = argparse.ArgumentParser(description="BLE receiver for Edge Impulse")
-parser.add_argument("--label", default="unknown", help="Label for the data (e.g., Squat)")
-args = parser.parse_args()
-LABEL = args.label
+# Label for the data, set from --label
+LABEL = "unknown"
+
+# Keep-alive HTTP session reused for every upload
+http_session = requests.Session()
+
+# Uploads run on one worker thread (in order, sharing http_session) instead of inside the notification handler,
+# where a blocking POST stalls the event loop and shows up as a notification gap
+upload_executor = ThreadPoolExecutor(max_workers=1)
+
+# Ingestion metrics (rate, jitter, drops, upload latency)
+metrics = IngestMetrics(sample_rate_hz=SAMPLE_RATE_HZ)
 
 # Callback function to handle incoming BLE notifications
 def notification_handler(sender, data):
     global data_buffer, sample_count
 
+    metrics.on_notification()
     try:
         data_str = data.decode("utf-8").strip()
         values = data_str.split(",")
-        if len(values) == 3:
+        # "x,y,z" or, from rep_tracker.ino, "x,y,z,exercise:Label"
+        if len(values) == 3 or (len(values) == 4 and values[3].startswith("exercise:")):
             # Add the data point to the buffer
             data_buffer.append([float(values[0]), float(values[1]), float(values[2])])
             sample_count += 1
+            metrics.on_sample()
 
             # If we've collected enough samples, send to Edge Impulse
             if sample_count >= SAMPLES_PER_REQUEST:
-                send_to_edge_impulse()
-                # Reset the buffer and counter
-                data_buffer.clear()
+                upload_executor.submit(send_to_edge_impulse, data_buffer)
+                # Start a new buffer (the upload keeps the full one)
+                data_buffer = []
                 sample_count = 0
+        else:
+            metrics.on_malformed()
 
     except Exception as e:
+        metrics.on_decode_error()
         print(f"Error decoding data: {e}", file=sys.stderr)
 
-def send_to_edge_impulse():
-    if not data_buffer:
+def send_to_edge_impulse(samples):
+    if not samples:
         return
 
     # Generate a unique filename for this sample
@@ -60,59 +73,81 @@ def send_to_edge_impulse():
     filename = f"{LABEL}_{timestamp}.json"
 
     # Prepare the data for Edge Impulse
-    payload = {
-        "protected": {
-            "ver": "v1",
-            "alg": "none"
-        },
-        "signature": "0".zfill(64),  # Dummy signature
-        "payload": {
-            "device_name": "Nano33BLE",
-            "device_type": "Arduino Nano 33 BLE Sense",
-            "interval_ms": 1000 // SAMPLE_RATE_HZ,  # 20 ms (50 Hz)
-            "sensors": [
-                {"name": "accX", "units": "m/s2"},
-                {"name": "accY", "units": "m/s2"},
-                {"name": "accZ", "units": "m/s2"}
-            ],
-            "values": data_buffer
-        }
-    }
-
-    # Send to Edge Impulse with the required headers
-    headers = {
-        "x-api-key": API_KEY,
-        "x-file-name": filename,
-        "x-label": LABEL
-    }
-    response = requests.post(INGESTION_URL, json=payload, headers=headers)
+    payload = build_payload(samples, 1000 // SAMPLE_RATE_HZ)  # 20 ms (50 Hz)
+    headers = build_headers(filename, LABEL)
+
+    start = time.perf_counter()
+    try:
+        response = http_session.post(INGESTION_URL, data=payload, headers=headers)
+    except requests.RequestException as e:
+        metrics.on_upload(time.perf_counter() - start, ok=False)
+        print(f"Failed to send: {e}", file=sys.stderr)
+        return
+    metrics.on_upload(time.perf_counter() - start, ok=response.status_code == 200)
     if response.status_code == 200:
         print(f"Sent sample: {filename} with label {LABEL}", file=sys.stderr)
     else:
         print(f"Failed to send: {response.text}", file=sys.stderr)
 
-async def main():
-    print("Scanning for Nano33BLE...", file=sys.stderr)
-    devices = await BleakScanner.discover()
-    target_device = None
-    for device in devices:
-        if device.name == "Nano33BLE":
-            target_device = device
-            break
-
-    if not target_device:
-        print("Could not find Nano33BLE device", file=sys.stderr)
-        sys.exit(1)
-
-    print(f"Found Nano33BLE at {target_device.address}", file=sys.stderr)
-
-    async with BleakClient(target_device.address) as client:
+async def main(metrics_port=0, summary_interval=10.0, replay=None, speed=1.0):
+    global metrics
+    if replay:
+        # Replayed sessions arrive `speed` times faster than the sensor rate
+        metrics = IngestMetrics(sample_rate_hz=SAMPLE_RATE_HZ * speed if speed > 0 else SAMPLE_RATE_HZ)
+    if metrics_port:
+        start_metrics_server(metrics, metrics_port)
+
+    if replay:
+        print(f"Replaying {replay} at {speed}x", file=sys.stderr)
+        client = ReplayClient(replay, speed=speed)
+    else:
+        print("Scanning for Nano33BLE...", file=sys.stderr)
+        devices = await BleakScanner.discover()
+        target_device = None
+        for device in devices:
+            if device.name == "Nano33BLE":
+                target_device = device
+                break
+
+        if not target_device:
+            print("Could not find Nano33BLE device", file=sys.stderr)
+            sys.exit(1)
+
+        print(f"Found Nano33BLE at {target_device.address}", file=sys.stderr)
+        client = BleakClient(target_device.address)
+
+    async with client:
         print("Connected to Nano33BLE", file=sys.stderr)
         await client.start_notify(CHARACTERISTIC_UUID, notification_handler)
         print("Subscribed to accelerometer data", file=sys.stderr)
 
-        while True:
-            await asyncio.sleep(1)
+        last_summary = time.monotonic()
+        while client.is_connected:
+            await asyncio.sleep(0.1 if replay else 1)
+            if summary_interval and time.monotonic() - last_summary >= summary_interval:
+                print(f"Metrics: {metrics.summary()}", file=sys.stderr)
+                last_summary = time.monotonic()
+
+    # Let queued uploads finish before reporting
+    await asyncio.get_running_loop().run_in_executor(None, upload_executor.shutdown)
+
+    if replay:
+        print(f"Replay: {client.summary()}", file=sys.stderr)
+        print(f"Metrics: {metrics.summary()}", file=sys.stderr)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # Parse command-line arguments for the label
+    parser = argparse.ArgumentParser(description="BLE receiver for Edge Impulse")
+    parser.add_argument("--label", default="unknown", help="Label for the data (e.g., Squat)")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Serve Prometheus-text metrics on this local port (0 = off)")
+    parser.add_argument("--summary-interval", type=float, default=10.0,
+                        help="Seconds between metrics summary lines on stderr (0 = off)")
+    parser.add_argument("--replay", default=None, help="Replay this session CSV instead of connecting to the board")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (1 = real time, 0 = as fast as possible)")
+    parser.add_argument("--url", default=INGESTION_URL, help="Ingestion endpoint (e.g. bulk_upload.py's mock server)")
+    args = parser.parse_args()
+    LABEL = args.label
+    INGESTION_URL = args.url
+
+    asyncio.run(main(args.metrics_port, args.summary_interval, args.replay, args.speed))
\ No newline at end of file
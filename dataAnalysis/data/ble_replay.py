@@ -0,0 +1,145 @@
+import sys
+import time
+import asyncio
+import inspect
+import argparse
+import numpy as np
+
+from session_io import read_session_csv, exercise_from_filename, canonical_exercise
+
+# Replay source for the BLE receive path: a drop-in stand-in for BleakClient that plays back a recorded
+# session as notifications in the byte format rep_tracker.ino sends ("x,y,z,exercise:Label", two decimals),
+# either with the original inter-arrival timing scaled by `speed` or as fast as possible (speed=0).
+#
+#   async with ReplayClient("Raw_data/Squats4_50Hz_2025-04-06T18-23-30.226394.csv", speed=10) as client:
+#       await client.start_notify(CHARACTERISTIC_UUID, notification_handler)
+#       await client.wait_finished()
+#
+#   python ble_replay.py Raw_data/Squats4_50Hz_2025-04-06T18-23-30.226394.csv --speed 1   # print to stdout
+
+
+def sketch_label(file_path):
+    return canonical_exercise(exercise_from_filename(file_path))
+
+
+def format_notifications(x, y, z, exercise):
+    """Encodes samples exactly like the sketch's snprintf("%.2f,%.2f,%.2f,exercise:%s")."""
+    suffix = f",exercise:{exercise}"
+    return [f"{a:.2f},{b:.2f},{c:.2f}{suffix}".encode("utf-8")
+            for a, b, c in zip(x.tolist(), y.tolist(), z.tolist())]
+
+
+class ReplayClient:
+    """
+    Stand-in for bleak.BleakClient that replays a session CSV to notification callbacks.
+
+    Parameters:
+    - file_path: Raw/Cleaned/Labeled session CSV.
+    - speed: Playback speed relative to the recording (1 = real time, 10 = 10x); 0 plays as fast as possible.
+    - exercise: Exercise label to append; derived from the file name when None.
+    """
+
+    def __init__(self, file_path, speed=1.0, exercise=None):
+        df = read_session_csv(file_path)
+        df = df[df['Timestamp'].notna()]
+        self.address = f"replay:{file_path}"
+        self.speed = speed
+        self.payloads = format_notifications(df['X'].to_numpy(), df['Y'].to_numpy(), df['Z'].to_numpy(),
+                                             exercise or sketch_label(file_path))
+        us = df['Timestamp'].to_numpy(dtype='datetime64[us]').astype(np.int64)
+        self.offsets = ((us - us[0]) / 1e6).tolist() if len(us) else []
+
+        self._task = None
+        self._connected = False
+        self.sent = 0
+        self.max_lag = 0.0  # Worst delay between a sample's scheduled time and its delivery, in seconds
+        self.callback_time = 0.0  # Total time spent inside the callback, in seconds
+        self.elapsed = 0.0
+
+    @property
+    def is_connected(self):
+        return self._connected
+
+    async def connect(self):
+        self._connected = True
+        return True
+
+    async def disconnect(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._connected = False
+        return True
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    async def start_notify(self, char_specifier, callback):
+        self._task = asyncio.get_running_loop().create_task(self._play(char_specifier, callback))
+
+    async def stop_notify(self, char_specifier):
+        await self.disconnect()
+
+    async def wait_finished(self):
+        if self._task is not None:
+            await self._task
+
+    async def _play(self, sender, callback):
+        is_coroutine = inspect.iscoroutinefunction(callback)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            for offset, payload in zip(self.offsets, self.payloads):
+                if self.speed > 0:
+                    target = start + offset / self.speed
+                    delay = target - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    else:
+                        self.max_lag = max(self.max_lag, -delay)
+                elif self.sent % 256 == 0:
+                    await asyncio.sleep(0)  # let other tasks run
+
+                before = time.perf_counter()
+                if is_coroutine:
+                    await callback(sender, bytearray(payload))
+                else:
+                    callback(sender, bytearray(payload))
+                self.callback_time += time.perf_counter() - before
+                self.sent += 1
+        finally:
+            # Also when the callback raises: `while client.is_connected` loops must end (disconnect() or
+            # wait_finished() then re-raises the callback's exception)
+            self.elapsed = loop.time() - start
+            self._connected = False
+
+    def summary(self):
+        duration = self.offsets[-1] if self.offsets else 0.0
+        rate = self.sent / self.elapsed if self.elapsed > 0 else float('inf')
+        per_call = self.callback_time / self.sent if self.sent else 0.0
+        return (f"replayed {self.sent} notifications ({duration:.1f}s of recording) in {self.elapsed:.2f}s "
+                f"-> {rate:.0f} notifications/s, handler {per_call * 1e6:.1f}us/call, "
+                f"max lag {self.max_lag * 1000:.1f}ms")
+
+
+async def _print_session(file_path, speed):
+    async with ReplayClient(file_path, speed=speed) as client:
+        await client.start_notify(None, lambda sender, data: print(data.decode("utf-8")))
+        await client.wait_finished()
+        print(client.summary(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print a recorded session as Nano33BLE notifications")
+    parser.add_argument("csv_file", help="Raw/Cleaned/Labeled session CSV")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed (0 = as fast as possible)")
+    args = parser.parse_args()
+    asyncio.run(_print_session(args.csv_file, args.speed))
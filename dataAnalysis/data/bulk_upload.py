@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from edge_impulse import INGESTION_URL, API_KEY, build_payload, build_headers
+from session_io import read_session_csv, parse_session_filename, exercise_from_filename, canonical_exercise
+from session_catalog import resolve_session_files, DEFAULT_DB
+
+# Bulk export of archived sessions (Raw_data / Cleaned_data / Labeled_data) to Edge Impulse.
+#
+#   python bulk_upload.py upload Labeled_data --workers 8 --progress upload_progress.jsonl
+#   python bulk_upload.py mock --port 4810          # local ingestion server for dry runs
+#   python bulk_upload.py upload Labeled_data --url http://127.0.0.1:4810/api/training/data
+#   python bulk_upload.py upload --where "exercise=Squat kind=labeled after=2025-04-01"   # from session_catalog
+#
+# Each session is sliced into WINDOW_MS windows (same size as ble_receiver's live uploads) and the windows
+# are posted concurrently over one keep-alive connection pool. Finished windows are appended to the
+# progress file, so an interrupted run resumes where it stopped.
+
+WINDOW_MS = 20000  # 20 seconds, as in ble_receiver
+MIN_WINDOW_FRACTION = 0.5  # Trailing windows shorter than this fraction of WINDOW_MS are skipped
+
+
+def slice_session(file_path, window_ms=WINDOW_MS, min_fraction=MIN_WINDOW_FRACTION):
+    """
+    Cuts one session into ingestion windows.
+
+    Parameters:
+    - file_path: Session CSV.
+    - window_ms: Window length in milliseconds.
+    - min_fraction: Minimum length of the trailing window, as a fraction of window_ms.
+
+    Returns:
+    - interval_ms: Median sample interval of the session (from the file name's rate if timestamps are unusable).
+    - windows: List of (n, 3) float arrays (X, Y, Z).
+    """
+    df = read_session_csv(file_path)
+    values = df[['X', 'Y', 'Z']].to_numpy(dtype=np.float64)
+    if len(values) < 2:
+        return 0.0, []
+    median_dt = df['Timestamp'].diff().dt.total_seconds().median()
+    if median_dt > 0:
+        interval_ms = round(float(median_dt) * 1000, 3)
+    else:
+        # Unparseable or repeated timestamps: fall back to the rate in the file name, else the nominal 50 Hz
+        rate_hz = (parse_session_filename(file_path) or {}).get('rate_hz') or 50
+        interval_ms = 1000 / rate_hz
+    window_size = max(int(round(window_ms / interval_ms)), 1)
+    windows = [values[i:i + window_size] for i in range(0, len(values), window_size)]
+    if windows and len(windows[-1]) < min_fraction * window_size:
+        windows.pop()
+    return interval_ms, windows
+
+
+def load_progress(progress_file):
+    """Returns the set of window keys already uploaded according to the progress file."""
+    done = set()
+    if progress_file and os.path.exists(progress_file):
+        with open(progress_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    done.add(json.loads(line)['key'])
+    return done
+
+
+def make_session(workers, retries=3):
+    """Keep-alive requests.Session with a connection pool sized for `workers` threads and retry/backoff."""
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['POST']))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def upload_sessions(files, label=None, url=INGESTION_URL, api_key=API_KEY, workers=4,
+                    progress_file=None, window_ms=WINDOW_MS):
+    """
+    Uploads every window of every session, skipping windows recorded in the progress file.
+
+    Parameters:
+    - files: Session CSV paths.
+    - label: Edge Impulse label; when None, the canonical exercise of each file name ('Squats' -> 'Squat';
+      spellings without a canonical name are kept as they are).
+    - url: Ingestion endpoint.
+    - api_key: Edge Impulse API key.
+    - workers: Maximum number of uploads in flight.
+    - progress_file: JSON-lines file of finished windows (None disables resuming).
+    - window_ms: Window length in milliseconds.
+
+    Returns:
+    - (uploaded, skipped, failed) window counts; a file that cannot be read or sliced counts as one failure.
+    """
+    done = load_progress(progress_file)
+    session = make_session(workers)
+    progress = open(progress_file, 'a') if progress_file else None
+    uploaded = skipped = failed = 0
+
+    # Windows in flight (queued or posting) across all files: the pool stays busy at file boundaries while
+    # memory stays bounded to a few windows plus the session being sliced
+    slots = threading.BoundedSemaphore(2 * workers)
+    lock = threading.Lock()
+
+    def post(key, filename, file_label, body):
+        nonlocal uploaded, failed
+        try:
+            response = session.post(url, data=body, headers=build_headers(filename, file_label, api_key),
+                                    timeout=60)
+            if response.status_code == 200 and progress:
+                with lock:
+                    progress.write(json.dumps({'key': key, 'label': file_label}) + '\n')
+                    progress.flush()
+        except Exception as e:  # not only RequestException: no window may end up neither uploaded nor failed
+            with lock:
+                failed += 1
+            print(f"Failed to send {key}: {e}", file=sys.stderr)
+            return
+        finally:
+            slots.release()
+        with lock:
+            if response.status_code == 200:
+                uploaded += 1
+            else:
+                failed += 1
+        if response.status_code != 200:
+            print(f"Failed to send {key}: {response.status_code} {response.text}", file=sys.stderr)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for file_path in files:
+                exercise = exercise_from_filename(file_path)
+                file_label = label or canonical_exercise(exercise, default=exercise)
+                stem = os.path.splitext(os.path.basename(file_path))[0].replace(' ', '')
+                try:
+                    interval_ms, windows = slice_session(file_path, window_ms)
+                except Exception as e:  # one unreadable file must not stop the bulk run
+                    with lock:
+                        failed += 1
+                    print(f"Failed to read {file_path}: {e}", file=sys.stderr)
+                    continue
+
+                for index, window in enumerate(windows):
+                    key = f"{os.path.basename(file_path)}#{window_ms}#{index}"
+                    if key in done:
+                        skipped += 1
+                        continue
+                    body = build_payload(window, interval_ms)
+                    slots.acquire()
+                    pool.submit(post, key, f"{stem}_w{index:03d}.json", file_label, body)
+                print(f"{file_path}: {len(windows)} windows queued ({file_label}, {interval_ms} ms)", file=sys.stderr)
+    finally:
+        if progress:
+            progress.close()
+        session.close()
+
+    return uploaded, skipped, failed
+
+
+def serve_mock_ingestion(port=4810, host='127.0.0.1'):
+    """
+    Local stand-in for the Edge Impulse ingestion API: validates each body and replies 200.
+
+    Returns:
+    - (server, received) where received is a list of (headers, payload) tuples.
+    """
+    received = []
+    lock = threading.Lock()
+
+    class IngestionHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                payload = json.loads(body)['payload']
+                assert all(len(row) == 3 for row in payload['values'])
+            except (ValueError, KeyError, TypeError, AssertionError):
+                self._reply(400, b'Invalid payload')
+                return
+            with lock:
+                received.append((dict(self.headers), payload))
+            self._reply(200, self.headers.get('x-file-name', '').encode('utf-8'))
+
+        def _reply(self, status, body):
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), IngestionHandler)
+    return server, received
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk upload of archived sessions to Edge Impulse")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upload = commands.add_parser("upload", help="Upload session CSVs (files or directories)")
+    upload.add_argument("paths", nargs="*", help="Session CSVs or directories of CSVs")
+    upload.add_argument("--where", default=None,
+                        help="Select sessions from the catalogue instead, e.g. 'exercise=Squat kind=labeled'")
+    upload.add_argument("--catalog", default=DEFAULT_DB, help="Catalogue database used with --where")
+    upload.add_argument("--label", default=None, help="Label for every window (default: canonical exercise from file name)")
+    upload.add_argument("--url", default=INGESTION_URL, help="Ingestion endpoint")
+    upload.add_argument("--workers", type=int, default=4, help="Maximum concurrent uploads")
+    upload.add_argument("--window-ms", type=int, default=WINDOW_MS, help="Window length in milliseconds")
+    upload.add_argument("--progress", default="upload_progress.jsonl",
+                        help="Progress file used to resume interrupted uploads ('' to disable)")
+
+    mock = commands.add_parser("mock", help="Run a local mock ingestion server")
+    mock.add_argument("--port", type=int, default=4810)
+
+    args = parser.parse_args()
+
+    if args.command == "upload":
+        start = time.perf_counter()
+        files = resolve_session_files(args.paths, args.where, args.catalog)
+        uploaded, skipped, failed = upload_sessions(files, label=args.label, url=args.url,
+                                                    workers=args.workers, progress_file=args.progress or None,
+                                                    window_ms=args.window_ms)
+        print(f"Uploaded {uploaded} windows, skipped {skipped} already uploaded, {failed} failed "
+              f"in {time.perf_counter() - start:.1f}s")
+        sys.exit(1 if failed else 0)
+    else:
+        server, received = serve_mock_ingestion(args.port)
+        print(f"Mock ingestion server on http://127.0.0.1:{server.server_port}/api/training/data")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"Received {len(received)} samples")
@@ -1,58 +1,146 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import io
+import os
+import sys
+import json
+import time
+import logging
+import argparse
 import numpy as np
 import kineticstoolkit.lab as ktk
+import stage_profiler as profiler
+from session_io import LABELED_COLUMNS, write_labeled_csv
+from rep_metrics import rep_metrics, rep_segments
+from event_proposals import PROPOSAL_DIR, events_from_sets, write_proposal, load_proposal, unlabeled_sessions
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
 
 # File path to your CSV (update this to your file location)
 csv_file = "C:/Users/paris/imu_visualizer/dataAnalysis/data/Raw_data/barbeleows_2025-03-30T15-06-49.910440.csv"  # Example path
 
+EVENT_NAMES = ['rep_start', 'set_start', 'set_end']
+# count_reps_and_sets settings used for event proposals (peaks of the smoothed magnitude, see propose_events)
+PROPOSAL_PARAMETERS = {'min_distance': 50, 'min_prominence': 0.8, 'set_gap_threshold': 5.0}
+
+
+# Structured results (instead of print-driven output)
+@dataclass
+class MagnitudeStats:
+    min: float
+    max: float
+    mean: float
+
+
+@dataclass
+class RepSummary:
+    set_number: int
+    rep_number: int
+    num_points: int
+    start: float  # seconds from session start
+    duration: float  # seconds
+    peak_magnitude: Optional[float] = None
+    time_to_peak: Optional[float] = None  # seconds from rep start
+    concentric: Optional[float] = None  # fraction of the rep before the peak
+    peak_velocity: Optional[float] = None  # integrated estimate, see rep_metrics.py
+
+
+@dataclass
+class SetSummary:
+    set_number: int
+    rep_count: int
+    num_points: int
+    start: float  # seconds from session start
+    duration: float  # seconds
+
+
+@dataclass
+class SessionStats:
+    sample_count: int
+    duration: float
+    rep_count: int
+    set_count: int
+    sets: List[SetSummary] = field(default_factory=list)
+    reps: List[RepSummary] = field(default_factory=list)
+    raw_magnitude: Optional[MagnitudeStats] = None
+    smoothed_magnitude: Optional[MagnitudeStats] = None
+
+
+def set_verbosity(verbose=True):
+    """
+    Switches the analysis output on or off.
+
+    Parameters:
+    - verbose: True logs per-stage stats, sets and reps (INFO); False only logs warnings and errors.
+    """
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format="%(message)s")
+    logger.setLevel(logging.INFO if verbose else logging.WARNING)
+
+
+def magnitude_stats(ts):
+    magnitude = np.asarray(ts.data['Magnitude'])
+    return MagnitudeStats(min=float(magnitude.min()), max=float(magnitude.max()), mean=float(magnitude.mean()))
+
 
 # Read the CSV, skipping the "Reps and Sets Summary" section
 def read_accelerometer_data(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-        accel_lines = []
-        for line in lines:
-            if line.strip() == "":
-                break
-            accel_lines.append(line)
-
-    df = pd.read_csv(io.StringIO(''.join(accel_lines)), skiprows=1)
-    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+    with profiler.stage('read_file') as st:
+        with open(file_path, 'r') as f:
+            lines = f.readlines()
+            accel_lines = []
+            for line in lines:
+                if line.strip() == "":
+                    break
+                accel_lines.append(line)
+        if profiler.is_enabled():
+            st.add(bytes_read=os.path.getsize(file_path))
+
+    with profiler.stage('parse_csv', samples=len(accel_lines) - 2):
+        df = pd.read_csv(io.StringIO(''.join(accel_lines)), skiprows=1)
+    with profiler.stage('to_datetime', samples=len(df)):
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
     return df
 
 
 # Prepare TimeSeries and calculate magnitude
+@profiler.profiled()
 def prepare_timeseries(df):
     ts = ktk.TimeSeries()
     ts.time = (df['Timestamp'] - df['Timestamp'].iloc[0]).dt.total_seconds().to_numpy()
     ts.data['X'] = df['X'].to_numpy()
     ts.data['Y'] = df['Y'].to_numpy()
     ts.data['Z'] = df['Z'].to_numpy()
-    ts.data['Magnitude'] = np.sqrt(df['X'] ** 2 + df['Y'] ** 2 + df['Z'] ** 2)
-    print(
-        f"Raw Magnitude Stats: Min={ts.data['Magnitude'].min():.2f}, Max={ts.data['Magnitude'].max():.2f}, Mean={ts.data['Magnitude'].mean():.2f}")
+    ts.data['Magnitude'] = np.sqrt(df['X'] ** 2 + df['Y'] ** 2 + df['Z'] ** 2).to_numpy()
+    if logger.isEnabledFor(logging.INFO):
+        stats = magnitude_stats(ts)
+        logger.info(f"Raw Magnitude Stats: Min={stats.min:.2f}, Max={stats.max:.2f}, Mean={stats.mean:.2f}")
     return ts
 
 
 # Smooth the TimeSeries data with a Butterworth filter
-# Smooth the TimeSeries data with a Butterworth filter
+@profiler.profiled()
 def smooth_timeseries(ts, fc=5.0, order=2, btype='lowpass', sample_rate=33.29):
     # Check raw sample rate
-    time_deltas = np.diff(ts.time)
-    avg_sample_rate = 1 / np.mean(time_deltas)
-    print(f"Raw Average Sample Rate: {avg_sample_rate:.2f} Hz")
+    if logger.isEnabledFor(logging.INFO):
+        avg_sample_rate = (len(ts.time) - 1) / (ts.time[-1] - ts.time[0])
+        logger.info(f"Raw Average Sample Rate: {avg_sample_rate:.2f} Hz")
 
     # Resample to a constant sample rate (33.29 Hz from data)
-    ts_resampled = ts.resample(sample_rate)
+    with profiler.stage('resample', samples=len(ts.time)):
+        ts_resampled = ts.resample(sample_rate)
 
     # Apply Butterworth filter to the resampled TimeSeries
-    ts_smoothed = ktk.filters.butter(ts_resampled, btype=btype, fc=fc, order=order)
+    with profiler.stage('butter', samples=len(ts_resampled.time)):
+        ts_smoothed = ktk.filters.butter(ts_resampled, btype=btype, fc=fc, order=order)
 
-    # Print smoothed magnitude stats for verification
-    print(
-        f"Smoothed Magnitude Stats: Min={ts_smoothed.data['Magnitude'].min():.2f}, Max={ts_smoothed.data['Magnitude'].max():.2f}, Mean={ts_smoothed.data['Magnitude'].mean():.2f}")
+    # Log smoothed magnitude stats for verification
+    if logger.isEnabledFor(logging.INFO):
+        stats = magnitude_stats(ts_smoothed)
+        logger.info(f"Smoothed Magnitude Stats: Min={stats.min:.2f}, Max={stats.max:.2f}, Mean={stats.mean:.2f}")
     return ts_smoothed
 
 # Manually edit events
@@ -78,7 +166,7 @@ def plot_z_with_filtered_local_max(ts, title="Local Maxima Below Zero in Z-Axis
     """
     # Ensure the data exists
     if 'Z' not in ts.data or len(ts.data['Z']) == 0:
-        print("Error: No 'Z' data available in the TimeSeries.")
+        logger.error("Error: No 'Z' data available in the TimeSeries.")
         return
 
     # Extract time and Z-axis acceleration data
@@ -135,33 +223,35 @@ def detect_cycles_peak_based(ts, min_height=0, min_distance=30, min_prominence=0
     - cycle_indices: Indices in the time array where peaks occur.
     """
     if 'Z' not in ts.data or len(ts.data['Z']) == 0:
-        print("Error: No 'Z' data available in the TimeSeries.")
+        logger.error("Error: No 'Z' data available in the TimeSeries.")
         return [], []
 
     time = ts.time
     z_data = ts.data['Z']
 
     # Detect peaks with adjustable sensitivity
-    peak_indices, _ = find_peaks(z_data, height=min_height, distance=min_distance, prominence=min_prominence)
+    with profiler.stage('find_peaks', samples=len(z_data)):
+        peak_indices, _ = find_peaks(z_data, height=min_height, distance=min_distance, prominence=min_prominence)
 
     # Extract peak times
     cycle_times = time[peak_indices]
 
-    print(f"Detected {len(cycle_times)} cycles based on peaks.")
+    logger.info(f"Detected {len(cycle_times)} cycles based on peaks.")
 
     return cycle_times, peak_indices
 
 
-def count_reps_and_sets(ts, min_height=0, min_distance=50, min_prominence=0.8, set_gap_threshold=5.0):
+def count_reps_and_sets(ts, min_height=0, min_distance=50, min_prominence=0.8, set_gap_threshold=5.0, data_key='Z'):
     """
     Counts the number of reps and sets based on detected peaks.
 
     Parameters:
-    - ts: KTK TimeSeries object containing 'Z' data key.
+    - ts: KTK TimeSeries object containing the data_key data key.
     - min_height: Minimum peak height to detect reps.
     - min_distance: Minimum number of points between reps.
     - min_prominence: Minimum prominence of peaks (to remove noise).
     - set_gap_threshold: Time gap (in seconds) between peaks to consider a new set.
+    - data_key: Signal to search for peaks (e.g. 'Magnitude', which does not depend on sensor orientation).
 
     Returns:
     - rep_count: Total number of reps detected.
@@ -169,19 +259,20 @@ def count_reps_and_sets(ts, min_height=0, min_distance=50, min_prominence=0.8, s
     - sets: List of sets, each containing a list of rep timestamps.
     """
 
-    if 'Z' not in ts.data or len(ts.data['Z']) == 0:
-        print("Error: No 'Z' data available in the TimeSeries.")
+    if data_key not in ts.data or len(ts.data[data_key]) == 0:
+        logger.error(f"Error: No '{data_key}' data available in the TimeSeries.")
         return 0, 0, []
 
     time = ts.time
-    z_data = ts.data['Z']
+    z_data = ts.data[data_key]
 
     # Detect reps (peaks)
-    peak_indices, _ = find_peaks(z_data, height=min_height, distance=min_distance, prominence=min_prominence)
+    with profiler.stage('find_peaks', samples=len(z_data)):
+        peak_indices, _ = find_peaks(z_data, height=min_height, distance=min_distance, prominence=min_prominence)
     rep_times = time[peak_indices]  # Get timestamps of detected reps
 
     if len(rep_times) == 0:
-        print("No reps detected.")
+        logger.info("No reps detected.")
         return 0, 0, []
 
     # Detect sets by checking for large gaps between reps
@@ -205,14 +296,80 @@ def count_reps_and_sets(ts, min_height=0, min_distance=50, min_prominence=0.8, s
     rep_count = sum(len(s) for s in sets)
     set_count = len(sets)
 
-    # Print results
-    print(f"Total Sets: {set_count}")
-    for i, s in enumerate(sets, start=1):
-        print(f"  Set {i}: {len(s)} reps | Start: {s[0]:.2f}s | End: {s[-1]:.2f}s | Duration: {s[-1] - s[0]:.2f}s")
+    # Log results
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Total Sets: {set_count}")
+        for i, s in enumerate(sets, start=1):
+            logger.info(f"  Set {i}: {len(s)} reps | Start: {s[0]:.2f}s | End: {s[-1]:.2f}s | Duration: {s[-1] - s[0]:.2f}s")
 
     return rep_count, set_count, sets
 
 
+def propose_events(ts_smoothed, min_distance=50, min_prominence=0.8, set_gap_threshold=5.0):
+    """
+    Proposes rep_start, set_start and set_end events from count_reps_and_sets.
+
+    Peaks are searched in the smoothed 'Magnitude' (the signal shown while labelling, independent of how the
+    sensor is mounted) above its median, i.e. above the resting level.
+
+    Parameters:
+    - ts_smoothed: KTK TimeSeries with a 'Magnitude' data key.
+    - min_distance, min_prominence, set_gap_threshold: As for count_reps_and_sets.
+
+    Returns:
+    - List of (time, name) tuples, see event_proposals.events_from_sets.
+    """
+    if len(ts_smoothed.time) == 0:
+        return []
+    min_height = float(np.median(ts_smoothed.data['Magnitude']))
+    _, _, sets = count_reps_and_sets(ts_smoothed, min_height=min_height, min_distance=min_distance,
+                                     min_prominence=min_prominence, set_gap_threshold=set_gap_threshold,
+                                     data_key='Magnitude')
+    return events_from_sets(sets, ts_smoothed.time[0], ts_smoothed.time[-1])
+
+
+def add_events(ts, events):
+    """Copy of ts with the given (time, name) events added."""
+    ts_events = ts.copy()
+    for event_time, name in events:
+        ts_events.add_event(event_time, name, in_place=True)
+    return ts_events
+
+
+# Compute and store the event proposal of one raw session (no GUI)
+def propose_session(csv_file, proposal_dir=PROPOSAL_DIR, parameters=PROPOSAL_PARAMETERS):
+    original_df = read_accelerometer_data(csv_file)
+    ts_smoothed = smooth_timeseries(prepare_timeseries(original_df), fc=5.0, order=2)
+    events = propose_events(ts_smoothed, **parameters)
+    return write_proposal(csv_file, events, parameters, proposal_dir), events
+
+
+def propose_sessions(files, proposal_dir=PROPOSAL_DIR, workers=4, force=False):
+    """
+    Writes event proposals for many sessions concurrently.
+
+    Parameters:
+    - files: Raw session CSVs.
+    - proposal_dir: Output directory of the proposal files.
+    - workers: Sessions processed concurrently.
+    - force: Recompute proposals that are already up to date.
+
+    Returns:
+    - List of (csv_file, events) for the sessions that were (re)proposed.
+    """
+    pending = [f for f in files if force or load_proposal(f, proposal_dir) is None]
+
+    def propose(file_path):
+        try:
+            return file_path, propose_session(file_path, proposal_dir)[1]
+        except Exception as e:  # one unreadable file must not stop the batch
+            logger.error(f"Error: could not propose events for {file_path}: {e}")
+            return file_path, None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [(f, events) for f, events in pool.map(propose, pending) if events is not None]
+
+
 def plot_cycles(ts, cycle_times, cycle_indices, title="Detected Cycles in Z-Axis Data"):
     """
     Plots the Z-axis acceleration and marks cycle start points.
@@ -245,16 +402,20 @@ def plot_cycles(ts, cycle_times, cycle_indices, title="Detected Cycles in Z-Axis
     plt.show()
 
 
-# Detect reps and sets based on manually edited events
+# Detect reps and sets based on manually edited events (ts_smoothed may already carry proposed events)
 def label_reps_and_sets(ts_smoothed, original_df, max_rep_duration=3.0):
     import matplotlib
     # Set interactive backend for GUI
     matplotlib.use('Qt5Agg')  # Use Qt5 backend for interactive plotting
 
-    # Prompt user to manually mark rep_start, set_start, and set_end events
-    print(
-        "Please mark 'rep_start' for each rep, 'set_start' for each set start, and 'set_end' for each set end in the plot.")
-    ts_events = ts_smoothed.ui_edit_events(data_keys=['Magnitude'])
+    # Prompt user to manually mark (or correct) rep_start, set_start, and set_end events
+    if ts_smoothed.events:
+        print(f"{len(ts_smoothed.events)} events proposed. Move, add or remove 'rep_start', 'set_start' and "
+              f"'set_end' events where they are wrong.")
+    else:
+        print("Please mark 'rep_start' for each rep, 'set_start' for each set start, and 'set_end' for each set "
+              "end in the plot.")
+    ts_events = ts_smoothed.ui_edit_events(name=EVENT_NAMES, data_keys=['Magnitude'])
 
     # Convert to DataFrame
     df = ts_events.to_dataframe()
@@ -307,10 +468,11 @@ def label_reps_and_sets(ts_smoothed, original_df, max_rep_duration=3.0):
             df.loc[mask, 'Rep_Number'] = rep_count
             df.loc[mask, 'Set_Number'] = current_set
 
-    print(f"Detected {rep_count} reps across {set_count if set_count > 0 else 1} sets")
+    logger.info(f"Detected {rep_count} reps across {set_count if set_count > 0 else 1} sets")
     return df, ts_events, rep_count, set_count
 
 # Plot raw, smoothed, and final rep/set data
+@profiler.profiled('plot')
 def plot_data(ts_raw, ts_smoothed, df):
     plt.figure(figsize=(15, 20))
 
@@ -338,11 +500,14 @@ def plot_data(ts_raw, ts_smoothed, df):
     # Plot Smoothed Magnitude with Rep Labels
     plt.subplot(4, 1, 3)
     plt.plot(ts_smoothed.time, ts_smoothed.data['Magnitude'], label='Smoothed Magnitude', color='purple')
-    for rep_num in df['Rep_Number'].unique():
-        if rep_num > 0:
-            subset = df[df['Rep_Number'] == rep_num]
-            set_num = subset['Set_Number'].iloc[0]
-            plt.scatter(subset.index, subset['Magnitude'], label=f"Set {set_num} Rep {rep_num}", s=10)
+    # Each rep is one contiguous slice of `order` (single sort instead of a filter per set and rep)
+    order, starts, counts, set_ids, rep_ids = rep_segments(df['Set_Number'], df['Rep_Number'])
+    times = np.asarray(df.index, dtype=np.float64)[order]
+    magnitudes = df['Magnitude'].to_numpy()[order]
+    rep_slices = [(int(set_num), int(rep_num), slice(start, start + count))
+                  for set_num, rep_num, start, count in zip(set_ids, rep_ids, starts, counts)]
+    for set_num, rep_num, rows in rep_slices:
+        plt.scatter(times[rows], magnitudes[rows], label=f"Set {set_num} Rep {rep_num}", s=10)
     plt.title('Smoothed Magnitude with Rep Labels by Set')
     plt.xlabel('Time (s)')
     plt.ylabel('Magnitude (m/s²)')
@@ -351,18 +516,11 @@ def plot_data(ts_raw, ts_smoothed, df):
 
     # Plot Overlaid Reps per Set
     plt.subplot(4, 1, 4)
-    set_numbers = df['Set_Number'].unique()
     colors = ['blue', 'green', 'red', 'orange', 'purple']
-    for set_num in set_numbers:
-        if set_num > 0:
-            set_df = df[df['Set_Number'] == set_num]
-            rep_numbers = set_df['Rep_Number'].unique()
-            for rep_num in rep_numbers:
-                if rep_num > 0:
-                    rep_df = set_df[set_df['Rep_Number'] == rep_num]
-                    time_normalized = rep_df.index - rep_df.index[0]  # Normalize time to rep start
-                    plt.plot(time_normalized, rep_df['Magnitude'], label=f"Set {set_num} Rep {rep_num}",
-                             color=colors[set_num % len(colors)], alpha=0.7)
+    for set_num, rep_num, rows in rep_slices:
+        time_normalized = times[rows] - times[rows][0]  # Normalize time to rep start
+        plt.plot(time_normalized, magnitudes[rows], label=f"Set {set_num} Rep {rep_num}",
+                 color=colors[set_num % len(colors)], alpha=0.7)
     plt.title('Overlaid Smoothed Magnitude of Reps per Set')
     plt.xlabel('Time (s) from Rep Start')
     plt.ylabel('Magnitude (m/s²)')
@@ -373,27 +531,137 @@ def plot_data(ts_raw, ts_smoothed, df):
     plt.show()
 
 
-# Save labeled data to a new CSV
+def _optional_float(value):
+    """float(value), or None for NaN (e.g. concentric of a single-sample rep), which JSON cannot encode."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+# Summarize a labeled DataFrame into session, set and rep stats (one segmented pass, see rep_metrics.py)
+def summarize_session(df):
+    """
+    Builds a SessionStats from a labeled DataFrame.
+
+    Parameters:
+    - df: DataFrame with 'Timestamp', 'Rep_Number' and 'Set_Number' columns, plus 'Magnitude' (or X, Y, Z)
+      for the rep kinematics.
+
+    Returns:
+    - SessionStats with one SetSummary per set and one RepSummary per rep (Set_Number/Rep_Number > 0).
+    """
+    timestamps = pd.to_datetime(df['Timestamp'])
+    session_duration = (timestamps.iloc[-1] - timestamps.iloc[0]).total_seconds() if len(timestamps) else 0.0
+
+    rep_table = rep_metrics(df)
+    reps = [
+        RepSummary(set_number=int(row.set_number), rep_number=int(row.rep_number), num_points=int(row.num_points),
+                   start=float(row.start), duration=float(row.duration),
+                   peak_magnitude=_optional_float(row.peak_magnitude),
+                   time_to_peak=_optional_float(row.time_to_peak), concentric=_optional_float(row.concentric),
+                   peak_velocity=_optional_float(row.peak_velocity))
+        for row in rep_table.itertuples(index=False)
+    ]
+
+    # Sets are derived from the rep table, not by re-filtering the DataFrame
+    rep_table['end'] = rep_table['start'] + rep_table['duration']
+    set_table = rep_table.groupby('set_number').agg(
+        rep_count=('rep_number', 'size'), num_points=('num_points', 'sum'), start=('start', 'min'), end=('end', 'max'))
+    sets = [
+        SetSummary(set_number=int(set_num), rep_count=int(rep_count), num_points=int(num_points),
+                   start=float(start), duration=float(end - start))
+        for set_num, rep_count, num_points, start, end in
+        zip(set_table.index, set_table['rep_count'], set_table['num_points'], set_table['start'], set_table['end'])
+    ]
+
+    return SessionStats(sample_count=len(df), duration=session_duration, rep_count=len(reps),
+                        set_count=len(sets), sets=sets, reps=reps)
+
+
+# Write session results for downstream dashboards (JSON or Parquet, by file extension)
+def write_session_results(stats, output_file):
+    """
+    Writes a SessionStats to disk.
+
+    Parameters:
+    - stats: SessionStats to write.
+    - output_file: '.json' writes the full nested result; '.parquet' writes the per-rep table
+      (requires pyarrow or fastparquet), with the session totals repeated on every row.
+    """
+    if output_file.endswith('.parquet'):
+        reps_df = pd.DataFrame([asdict(r) for r in stats.reps],
+                               columns=[f.name for f in RepSummary.__dataclass_fields__.values()])
+        reps_df['session_sample_count'] = stats.sample_count
+        reps_df['session_duration'] = stats.duration
+        reps_df['session_rep_count'] = stats.rep_count
+        reps_df['session_set_count'] = stats.set_count
+        reps_df.to_parquet(output_file, index=False)
+    else:
+        with open(output_file, 'w') as f:
+            json.dump(asdict(stats), f, indent=2, allow_nan=False)
+    logger.info(f"Session results saved to {output_file}")
+
+
+# Save labeled data to a new CSV (gzip/zstd compressed if output_file ends in .gz/.zst)
 def save_labeled_data(df, output_file):
     # Ensure 'Exercise' column exists; add it if missing with a default value
     if 'Exercise' not in df.columns:
         df['Exercise'] = 'unknown'  # Default value; overridden in main block if set
-    labeled_df = df[['Timestamp', 'X', 'Y', 'Z', 'Label', 'Exercise', 'Rep_Number', 'Set_Number']]
-    labeled_df.to_csv(output_file, index=False)
-    print(f"Labeled data saved to {output_file}")
-    for set_num in df['Set_Number'].unique():
-        if set_num > 0:
-            set_df = df[df['Set_Number'] == set_num]
-            rep_numbers = set_df['Rep_Number'].unique()
-            print(f"Set {set_num}:")
-            for rep_num in rep_numbers:
-                if rep_num > 0:
-                    rep_data = set_df[set_df['Rep_Number'] == rep_num]
-                    num_points = len(rep_data)
-                    duration = (rep_data['Timestamp'].iloc[-1] - rep_data['Timestamp'].iloc[0]).total_seconds()
-                    print(f"  Rep {rep_num}: {num_points} data points, Duration: {duration:.2f} seconds")
+    with profiler.stage('write_csv', samples=len(df)):
+        write_labeled_csv(df, output_file, columns=LABELED_COLUMNS)
+    logger.info(f"Labeled data saved to {output_file}")
+
+    stats = summarize_session(df)
+    if logger.isEnabledFor(logging.INFO):
+        for set_summary in stats.sets:
+            logger.info(f"Set {set_summary.set_number}:")
+            for rep in stats.reps:
+                if rep.set_number == set_summary.set_number:
+                    logger.info(f"  Rep {rep.rep_number}: {rep.num_points} data points, "
+                                f"Duration: {rep.duration:.2f} seconds, Peak: {rep.peak_magnitude:.2f} m/s² "
+                                f"after {rep.time_to_peak:.2f} s")
+    return stats
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Label reps and sets in a raw accelerometer session")
+    parser.add_argument("csv_file", nargs="*",
+                        help="Raw session CSV (with --propose: CSVs or directories, default Raw_data)")
+    parser.add_argument("--quiet", action="store_true", help="Only log warnings and errors")
+    parser.add_argument("--results", default=None,
+                        help="Also write session results to this .json or .parquet file")
+    parser.add_argument("--profile", nargs="?", const="profile", default=None, metavar="PREFIX",
+                        help="Time each stage and write PREFIX_stages.csv and PREFIX.folded at exit "
+                             "(same as REPTRACKER_PROFILE=1)")
+    parser.add_argument("--propose", action="store_true",
+                        help="Headless: write event proposals for every unlabeled session, then exit")
+    parser.add_argument("--proposals", default=PROPOSAL_DIR, help="Directory of the event proposal files")
+    parser.add_argument("--force", action="store_true", help="With --propose, also redo up-to-date proposals")
+    parser.add_argument("--workers", type=int, default=4, help="With --propose, sessions processed concurrently")
+    parser.add_argument("--manual", action="store_true", help="Start labelling without proposed events")
+    args = parser.parse_args()
+    set_verbosity(not args.quiet)
+    if args.profile:
+        profiler.enable(args.profile)
+
+    if args.propose:
+        data_dir = os.path.dirname(os.path.abspath(__file__))
+        files = unlabeled_sessions(args.csv_file or [os.path.join(data_dir, "Raw_data")],
+                                   labeled_dirs=[os.path.join(data_dir, "Labeled_data")])
+        set_verbosity(False)  # per-set logs of hundreds of sessions would interleave
+        start = time.perf_counter()
+        proposed = propose_sessions(files, args.proposals, workers=args.workers, force=args.force)
+        for file_path, events in proposed:
+            rep_count = sum(name == 'rep_start' for _, name in events)
+            set_count = sum(name == 'set_start' for _, name in events)
+            print(f"{os.path.basename(file_path)}: {rep_count} reps, {set_count} sets")
+        print(f"{len(proposed)} proposals written to {args.proposals} ({len(files) - len(proposed)} of "
+              f"{len(files)} unlabeled sessions up to date or failed) in {time.perf_counter() - start:.2f}s",
+              file=sys.stderr)
+        sys.exit(0)
+
+    if len(args.csv_file) > 1:
+        parser.error("label one session at a time (use --propose for batches)")
+    csv_file = args.csv_file[0] if args.csv_file else csv_file
+
     # Read and process the data
     original_df = read_accelerometer_data(csv_file)
     ts_raw = prepare_timeseries(original_df)
@@ -401,6 +669,12 @@ if __name__ == "__main__":
     # Smooth the data
     ts_smoothed = smooth_timeseries(ts_raw, fc=5.0, order=2)
 
+    # Seed the editor with proposed events (stored by --propose, else computed now)
+    if not args.manual:
+        events = load_proposal(csv_file, args.proposals)
+        if events is None:
+            events = propose_events(ts_smoothed, **PROPOSAL_PARAMETERS)
+        ts_smoothed = add_events(ts_smoothed, events)
 
     # Label reps and sets with manual event editing
     while True:
@@ -412,7 +686,11 @@ if __name__ == "__main__":
         response = input(f"Detected {rep_count} reps across {set_count} sets. Save file? (yes/no/reedit): ").lower()
         if response == 'yes':
             output_file = csv_file.replace('.csv', '_labeled.csv')
-            save_labeled_data(df, output_file)
+            stats = save_labeled_data(df, output_file)
+            stats.raw_magnitude = magnitude_stats(ts_raw)
+            stats.smoothed_magnitude = magnitude_stats(ts_smoothed)
+            if args.results:
+                write_session_results(stats, args.results)
             break
         elif response == 'no':
             print("File not saved.")
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from session_io import read_session_csv, parse_session_filename, write_labeled_csv
+
+# Multi-session training set builder (used by ShuflingTest.py).
+#
+# build_dataset() loads sessions concurrently and appends each one, in file order, to a flat binary file of
+# SAMPLE_DTYPE records as soon as it is loaded, so at most `workers + 1` sessions are in memory at a time.
+# The sampling rate and the Idle -> Transition -> Exercise -> Transition -> Idle cycles of each session are
+# computed during that single load and stored next to the samples:
+#
+#   <prefix>.samples      SAMPLE_DTYPE records of all sessions, back to back (opened as a np.memmap)
+#   <prefix>.cycles.npy   (n, 3) int64: start row, end row (exclusive), session index
+#   <prefix>.json         labels, per-session path / rate / row range
+#
+# SessionDataset then shuffles and splits by cycle and streams the result to CSV chunk by chunk.
+# Sessions whose X/Y/Z samples duplicate an earlier one (e.g. bicepCurl1 _labeled, _labeled_cleaned and
+# _labeled_labeled in Labeled_data) are merged once, so identical cycles cannot land in both train and test.
+
+SAMPLE_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('label', 'i1'), ('session', '<i4')])
+CYCLE_STATES = ['Idle', 'Transition', 'Exercise', 'Transition', 'Idle']
+OUTPUT_COLUMNS = ['Timestamp', 'X', 'Y', 'Z', 'Label']
+DEFAULT_RATE_HZ = 50
+
+
+def session_rate_hz(df, file_path):
+    """Sampling rate from the median timestamp interval (file name's rate, else 50 Hz, if timestamps are unusable)."""
+    median_dt = df['Timestamp'].diff().dt.total_seconds().median()
+    if median_dt > 0:
+        return 1 / median_dt
+    return (parse_session_filename(file_path) or {}).get('rate_hz') or DEFAULT_RATE_HZ
+
+
+def extract_cycles(labels, label_names):
+    """
+    Row ranges of complete cycles in one session.
+
+    A cycle starts at an Idle row and runs through the next Transition, Exercise and Transition up to and
+    including the first row of the following Idle run; the next cycle starts right after it. Rows after the
+    last complete cycle (or the whole session if there is none) are returned as a final incomplete cycle.
+
+    Parameters:
+    - labels: Integer label codes of the session's rows (-1 = missing).
+    - label_names: Names of the codes.
+
+    Returns:
+    - (n, 2) int64 array of [start, end) row ranges.
+    """
+    n = len(labels)
+    names = list(label_names)
+    positions = {state: np.flatnonzero(labels == names.index(state)) if state in names else np.empty(0, np.int64)
+                 for state in set(CYCLE_STATES)}
+    idle = names.index('Idle') if 'Idle' in names else None
+
+    def next_row(state, i):
+        rows = positions[state]
+        k = np.searchsorted(rows, i)
+        return int(rows[k]) if k < len(rows) else n
+
+    cycles = []
+    i = 0
+    while i < n - 1:
+        if labels[i] != idle:
+            i = next_row('Idle', i)
+            continue
+        start = j = i
+        for state in CYCLE_STATES[1:]:
+            j = next_row(state, j)
+            if j >= n:
+                break
+        if j >= n:
+            break  # no later start can complete a cycle either
+        cycles.append((start, j + 1))
+        i = j + 1
+
+    last_end = cycles[-1][1] if cycles else 0
+    if last_end < n:
+        cycles.append((last_end, n))
+    return np.array(cycles, dtype=np.int64).reshape(-1, 2)
+
+
+def load_session(file_path):
+    """
+    Reads one labeled session and derives everything the dataset needs from that single read.
+
+    Returns:
+    - dict with 'path', 'rate_hz', 'xyz' ((n, 3) float32), 'sha1' (of the xyz bytes), 'labels' (int codes),
+      'label_names' and 'cycles'.
+    """
+    df = read_session_csv(file_path)
+    labels, label_names = pd.factorize(df['Label']) if 'Label' in df.columns else (np.full(len(df), -1), [])
+    xyz = df[['X', 'Y', 'Z']].to_numpy(dtype=np.float32)
+    return {
+        'path': file_path,
+        'rate_hz': session_rate_hz(df, file_path),
+        'xyz': xyz,
+        'sha1': hashlib.sha1(xyz.tobytes()).hexdigest(),
+        'labels': labels,
+        'label_names': list(label_names),
+        'cycles': extract_cycles(labels, label_names),
+    }
+
+
+def build_dataset(files, prefix, workers=4):
+    """
+    Loads sessions concurrently and writes them to the memory-mapped dataset at `prefix`.
+
+    Sessions without any label, and sessions with the same X/Y/Z samples as an earlier file (derived copies
+    of one recording), are skipped with a warning.
+
+    Returns:
+    - SessionDataset opened on the result.
+    """
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    labels = []
+    sessions = []
+    cycles = []
+    seen = {}  # sha1 of the samples -> path of the first session with them
+    offset = 0
+
+    def append(session, out):
+        nonlocal offset
+        n = len(session['xyz'])
+        if n == 0 or (session['labels'] < 0).all():
+            print(f"Warning: {session['path']} has no labeled samples, skipped.", file=sys.stderr)
+            return
+        if session['sha1'] in seen:
+            print(f"Warning: {session['path']} has the same samples as {seen[session['sha1']]}, skipped.",
+                  file=sys.stderr)
+            return
+        seen[session['sha1']] = session['path']
+        for name in session['label_names']:
+            if name not in labels:
+                labels.append(name)
+        mapping = np.array([labels.index(name) for name in session['label_names']] + [-1], dtype=np.int8)
+
+        records = np.empty(n, dtype=SAMPLE_DTYPE)
+        records['x'], records['y'], records['z'] = session['xyz'].T
+        records['label'] = mapping[session['labels']]  # code -1 picks the trailing -1
+        records['session'] = len(sessions)
+        records.tofile(out)
+
+        session_cycles = session['cycles'] + offset
+        cycles.append(np.column_stack([session_cycles, np.full(len(session_cycles), len(sessions))]))
+        sessions.append({'path': session['path'], 'rate_hz': session['rate_hz'], 'offset': offset, 'count': n})
+        offset += n
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(prefix + '.samples', 'wb') as out:
+        pending = deque()
+        for file_path in files:
+            pending.append(pool.submit(load_session, file_path))
+            if len(pending) > workers:
+                append(pending.popleft().result(), out)
+        while pending:
+            append(pending.popleft().result(), out)
+
+    np.save(prefix + '.cycles.npy', np.concatenate(cycles) if cycles else np.empty((0, 3), dtype=np.int64))
+    with open(prefix + '.json', 'w') as f:
+        json.dump({'dtype': SAMPLE_DTYPE.descr, 'count': offset, 'labels': labels, 'sessions': sessions}, f, indent=1)
+    return SessionDataset(prefix)
+
+
+class SessionDataset:
+    """
+    Read-only view of a dataset written by build_dataset().
+
+    Attributes:
+    - samples: np.memmap of SAMPLE_DTYPE records.
+    - cycles: (n, 3) int64 array of [start, end) rows and session index.
+    - labels: Label names indexed by the 'label' field.
+    - sessions: Per-session dicts (path, rate_hz, offset, count).
+    """
+
+    def __init__(self, prefix):
+        with open(prefix + '.json', 'r') as f:
+            meta = json.load(f)
+        self.labels = meta['labels']
+        self.sessions = meta['sessions']
+        self.cycles = np.load(prefix + '.cycles.npy')
+        if meta['count']:
+            self.samples = np.memmap(prefix + '.samples', dtype=SAMPLE_DTYPE, mode='r', shape=(meta['count'],))
+        else:
+            self.samples = np.empty(0, dtype=SAMPLE_DTYPE)
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def rate_hz(self):
+        """Median sampling rate over the sessions."""
+        return float(np.median([s['rate_hz'] for s in self.sessions])) if self.sessions else DEFAULT_RATE_HZ
+
+    def shuffled_split(self, test_fraction=0.0, seed=42):
+        """
+        Shuffles the cycles and splits them into train and test sets.
+
+        Returns:
+        - (train, test) arrays of cycle indices, in shuffled order.
+        """
+        order = np.random.default_rng(seed).permutation(len(self.cycles))
+        n_test = int(round(len(order) * test_fraction))
+        return order[n_test:], order[:n_test]
+
+    def iter_frames(self, cycle_indices, rate_hz=None, start_time="2025-03-30 14:00:00", chunk_rows=200_000):
+        """
+        Yields the given cycles, concatenated in order, as DataFrames of about chunk_rows rows.
+
+        Timestamps are regenerated as one continuous series at rate_hz (default: the dataset's median rate).
+        """
+        step_us = 1e6 / (rate_hz or self.rate_hz)
+        start = np.datetime64(pd.Timestamp(start_time).to_datetime64(), 'us')
+        categories = pd.Index(self.labels)
+        ranges = self.cycles[np.asarray(cycle_indices, dtype=np.int64), :2]
+        lengths = ranges[:, 1] - ranges[:, 0]
+        row = 0
+        i = 0
+        while i < len(ranges):
+            # Take whole cycles until the chunk is full
+            j = i + max(int(np.searchsorted(np.cumsum(lengths[i:]), chunk_rows, side='right')), 1)
+            index = np.concatenate([np.arange(a, b) for a, b in ranges[i:j]])
+            records = self.samples[index]
+            n = len(records)
+            yield pd.DataFrame({
+                'Timestamp': start + np.rint((row + np.arange(n)) * step_us).astype('timedelta64[us]'),
+                'X': records['x'],
+                'Y': records['y'],
+                'Z': records['z'],
+                'Label': pd.Categorical.from_codes(records['label'], categories=categories),
+            })
+            row += n
+            i = j
+
+    def write_csv(self, output_file, cycle_indices, **kwargs):
+        """Streams the given cycles to a Timestamp,X,Y,Z,Label CSV (kwargs as for iter_frames)."""
+        write_labeled_csv(self.iter_frames(cycle_indices, **kwargs), output_file, columns=OUTPUT_COLUMNS)
+        return int((self.cycles[cycle_indices, 1] - self.cycles[cycle_indices, 0]).sum())
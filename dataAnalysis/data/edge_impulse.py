@@ -0,0 +1,52 @@
+import json
+
+# Edge Impulse API settings
+API_KEY = "ei_a0bb646faa68dd8fcd5b57a33dc11f9ee85ae9283cb82a66ef855477e05b7e2c"  # Replace with your full API key
+PROJECT_ID = "149805"  # Replace with your project ID
+INGESTION_URL = "https://ingestion.edgeimpulse.com/api/training/data"
+
+# Data acquisition header; "values" is spliced in by build_payload
+_PAYLOAD_HEAD = {
+    "protected": {
+        "ver": "v1",
+        "alg": "none"
+    },
+    "signature": "0".zfill(64),  # Dummy signature
+}
+
+
+def build_payload(values, interval_ms):
+    """
+    Serialises one ingestion sample to the Edge Impulse data acquisition JSON format.
+
+    Parameters:
+    - values: [[accX, accY, accZ], ...] list, or an (n, 3) NumPy array.
+    - interval_ms: Time between samples in milliseconds.
+
+    Returns:
+    - The request body as UTF-8 bytes.
+    """
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    body = dict(_PAYLOAD_HEAD)
+    body["payload"] = {
+        "device_name": "Nano33BLE",
+        "device_type": "Arduino Nano 33 BLE Sense",
+        "interval_ms": interval_ms,
+        "sensors": [
+            {"name": "accX", "units": "m/s2"},
+            {"name": "accY", "units": "m/s2"},
+            {"name": "accZ", "units": "m/s2"}
+        ],
+        "values": values
+    }
+    return json.dumps(body, separators=(",", ":")).encode("utf-8")
+
+
+def build_headers(filename, label, api_key=API_KEY):
+    return {
+        "x-api-key": api_key,
+        "x-file-name": filename,
+        "x-label": label,
+        "Content-Type": "application/json"
+    }
@@ -0,0 +1,122 @@
+import os
+import json
+import numpy as np
+
+from session_io import list_session_files, parse_session_filename, DERIVED_SUFFIXES
+
+# Proposed rep/set events for the labeller (dataAnalysis1.label_reps_and_sets).
+#
+# Instead of clicking every rep_start, set_start and set_end in ui_edit_events, the labeller opens with events
+# derived from count_reps_and_sets (rep peaks, grouped into sets by gaps), so only the wrong ones have to be
+# moved, added or removed. dataAnalysis1 computes the proposals; this module places the events and stores them:
+#
+#   python dataAnalysis1.py --propose Raw_data      # headless: proposals for every unlabeled raw session
+#   python dataAnalysis1.py Raw_data/<session>.csv  # opens with the stored proposal (computed if missing)
+#
+# Proposals are written to PROPOSAL_DIR/<session>.events.json together with the source file's size and mtime,
+# so a proposal is only reused for the exact file it was computed from.
+#
+# Event placement (seconds from session start, the labeller's TimeSeries time base):
+#   rep_start   half-way between consecutive peaks of a set; half a peak interval before the first peak
+#   set_start   at the first rep_start of the set
+#   set_end     half a peak interval after the last peak of the set
+# The peak interval is the set's median (the session's median for single-rep sets, else DEFAULT_HALF_REP * 2).
+
+PROPOSAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "proposals")
+PROPOSAL_SUFFIX = ".events.json"
+DEFAULT_HALF_REP = 1.0  # seconds
+
+
+def events_from_sets(sets, start_time=0.0, end_time=None):
+    """
+    Places rep_start, set_start and set_end events around the rep peaks of count_reps_and_sets.
+
+    Parameters:
+    - sets: List of sets, each a list of rep peak times (seconds), as returned by count_reps_and_sets.
+    - start_time, end_time: Time range of the session; events are clipped to it.
+
+    Returns:
+    - List of (time, name) tuples in time order (set_start before the rep_start at the same time).
+    """
+    intervals = [np.diff(s) for s in sets if len(s) > 1]
+    session_half = float(np.median(np.concatenate(intervals))) / 2 if intervals else DEFAULT_HALF_REP
+    end_time = np.inf if end_time is None else end_time
+
+    events = []
+    for peaks in sets:
+        peaks = np.asarray(peaks, dtype=np.float64)
+        half = float(np.median(np.diff(peaks))) / 2 if len(peaks) > 1 else session_half
+        starts = np.clip(np.r_[peaks[0] - half, (peaks[:-1] + peaks[1:]) / 2], start_time, end_time)
+        events.append((float(starts[0]), 'set_start'))
+        events += [(float(t), 'rep_start') for t in starts]
+        events.append((float(min(peaks[-1] + half, end_time)), 'set_end'))
+    return events
+
+
+def proposal_path(csv_file, proposal_dir=PROPOSAL_DIR):
+    return os.path.join(proposal_dir, os.path.splitext(os.path.basename(csv_file))[0] + PROPOSAL_SUFFIX)
+
+
+def _source_stamp(csv_file):
+    stat = os.stat(csv_file)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def write_proposal(csv_file, events, parameters=None, proposal_dir=PROPOSAL_DIR):
+    """
+    Stores the proposed events of csv_file.
+
+    Returns:
+    - Path of the proposal file.
+    """
+    os.makedirs(proposal_dir, exist_ok=True)
+    output_file = proposal_path(csv_file, proposal_dir)
+    proposal = {
+        'source': os.path.basename(csv_file),
+        **_source_stamp(csv_file),
+        'parameters': parameters or {},
+        'rep_count': sum(name == 'rep_start' for _, name in events),
+        'set_count': sum(name == 'set_start' for _, name in events),
+        'events': [{'time': t, 'name': name} for t, name in events],
+    }
+    with open(output_file + '.tmp', 'w') as f:
+        json.dump(proposal, f, indent=1)
+    os.replace(output_file + '.tmp', output_file)
+    return output_file
+
+
+def load_proposal(csv_file, proposal_dir=PROPOSAL_DIR):
+    """
+    Proposed events of csv_file, or None if there is no proposal or it was computed from a different file.
+
+    Returns:
+    - List of (time, name) tuples.
+    """
+    try:
+        with open(proposal_path(csv_file, proposal_dir), 'r') as f:
+            proposal = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stamp = _source_stamp(csv_file)
+    if proposal.get('size') != stamp['size'] or proposal.get('mtime') != stamp['mtime']:
+        return None
+    return [(float(event['time']), event['name']) for event in proposal['events']]
+
+
+def is_labeled(csv_file, labeled_dirs=()):
+    """True if a <session>_labeled.csv exists next to csv_file or in one of labeled_dirs."""
+    name = os.path.splitext(os.path.basename(csv_file))[0] + '_labeled.csv'
+    return any(os.path.exists(os.path.join(directory, name))
+               for directory in (os.path.dirname(csv_file), *labeled_dirs))
+
+
+def unlabeled_sessions(paths, labeled_dirs=()):
+    """Raw session CSVs among paths (no _cleaned/_labeled/_fixed suffix) that have no labeled output yet."""
+    files = []
+    for file_path in list_session_files(paths):
+        meta = parse_session_filename(file_path)
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        suffix = meta['suffix'] if meta else next((s for s in DERIVED_SUFFIXES if stem.endswith(s)), '')
+        if not suffix and not is_labeled(file_path, labeled_dirs):
+            files.append(file_path)
+    return files
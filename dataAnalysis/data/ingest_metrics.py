@@ -0,0 +1,212 @@
+import sys
+import math
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Live ingestion metrics for the BLE receivers: notification rate, inter-arrival jitter,
+# decode errors, missed samples (deficit against the nominal rate) and upload latency.
+# Every update is O(1) (histograms use a fixed, small bucket list), so it is safe to call
+# from the notification handler on every sample.
+
+INTERVAL_BUCKETS = (0.005, 0.01, 0.015, 0.02, 0.025, 0.03, 0.04, 0.05, 0.1, 0.25, 0.5, 1.0)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout (bucket counts, sum, count)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, help_text):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.sum}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class IngestMetrics:
+    """
+    Counters and histograms for one BLE data stream.
+
+    Parameters:
+    - sample_rate_hz: Nominal sample rate of the sensor (SAMPLE_RATE_HZ), used for jitter and missed samples.
+
+    Missed samples are the deficit against the nominal rate since the first notification, not a count per
+    gap: BLE delivers notifications in bursts (short and long intervals alternating), and the burst after a
+    long interval pays the apparent gap back.
+    """
+
+    def __init__(self, sample_rate_hz=50):
+        self.nominal_period = 1.0 / sample_rate_hz
+        self.started = time.monotonic()
+
+        self.notifications = 0
+        self.samples = 0
+        self.decode_errors = 0
+        self.malformed = 0
+        self.uploads_ok = 0
+        self.uploads_failed = 0
+
+        self.interval = Histogram(INTERVAL_BUCKETS)
+        self.upload_latency = Histogram(LATENCY_BUCKETS)
+
+        # Welford running mean/variance of the inter-arrival time
+        self._first_arrival = None
+        self._last_arrival = None
+        self._interval_mean = 0.0
+        self._interval_m2 = 0.0
+
+        # Window state for the periodic summary
+        self._window_start = self.started
+        self._window_notifications = 0
+
+    def on_notification(self, now=None):
+        """Records the arrival of one BLE notification (call before decoding it)."""
+        if now is None:
+            now = time.monotonic()
+        self.notifications += 1
+        last = self._last_arrival
+        self._last_arrival = now
+        if last is None:
+            self._first_arrival = now
+            return
+        dt = now - last
+        self.interval.observe(dt)
+        n = self.interval.count
+        delta = dt - self._interval_mean
+        self._interval_mean += delta / n
+        self._interval_m2 += delta * (dt - self._interval_mean)
+
+    def on_sample(self):
+        self.samples += 1
+
+    def on_decode_error(self):
+        self.decode_errors += 1
+
+    def on_malformed(self):
+        self.malformed += 1
+
+    def on_upload(self, latency, ok):
+        self.upload_latency.observe(latency)
+        if ok:
+            self.uploads_ok += 1
+        else:
+            self.uploads_failed += 1
+
+    @property
+    def missed_samples(self):
+        """Notifications expected at the nominal rate between the first and last arrival, minus those received."""
+        if self._first_arrival is None:
+            return 0
+        expected = (self._last_arrival - self._first_arrival) / self.nominal_period + 1
+        return max(int(round(expected - self.notifications)), 0)
+
+    @property
+    def interval_mean(self):
+        return self._interval_mean
+
+    @property
+    def jitter(self):
+        """Standard deviation of the inter-arrival time, in seconds."""
+        n = self.interval.count
+        return math.sqrt(self._interval_m2 / (n - 1)) if n > 1 else 0.0
+
+    @property
+    def mean_rate(self):
+        return 1.0 / self._interval_mean if self._interval_mean > 0 else 0.0
+
+    def summary(self, now=None):
+        """One-line summary; the rate is measured since the previous summary() call."""
+        if now is None:
+            now = time.monotonic()
+        elapsed = now - self._window_start
+        window_rate = (self.notifications - self._window_notifications) / elapsed if elapsed > 0 else 0.0
+        self._window_start = now
+        self._window_notifications = self.notifications
+
+        latency = self.upload_latency
+        mean_latency = latency.sum / latency.count if latency.count else 0.0
+        return (f"rate={window_rate:.1f}Hz (nominal {1.0 / self.nominal_period:.0f}Hz) "
+                f"jitter={self.jitter * 1000:.1f}ms notifications={self.notifications} samples={self.samples} "
+                f"missed~{self.missed_samples} malformed={self.malformed} decode_errors={self.decode_errors} "
+                f"uploads={self.uploads_ok} ok/{self.uploads_failed} failed "
+                f"upload_latency={mean_latency * 1000:.0f}ms")
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        counters = [
+            ("ble_notifications_total", "BLE notifications received", self.notifications),
+            ("ble_samples_total", "Accelerometer samples decoded", self.samples),
+            ("ble_decode_errors_total", "Notifications that failed to decode", self.decode_errors),
+            ("ble_malformed_total", "Notifications with an unexpected field count", self.malformed),
+            ("ble_uploads_total{result=\"ok\"}", "Edge Impulse uploads", self.uploads_ok),
+            ("ble_uploads_total{result=\"failed\"}", "Edge Impulse uploads", self.uploads_failed),
+        ]
+        lines = []
+        seen = set()
+        for name, help_text, value in counters:
+            base = name.split("{")[0]
+            if base not in seen:
+                seen.add(base)
+                lines.append(f"# HELP {base} {help_text}")
+                lines.append(f"# TYPE {base} counter")
+            lines.append(f"{name} {value}")
+        gauges = [
+            ("ble_nominal_rate_hz", "Nominal sensor sample rate", 1.0 / self.nominal_period),
+            ("ble_mean_rate_hz", "Mean notification rate since start", self.mean_rate),
+            ("ble_missed_samples", "Notification deficit against the nominal rate since the first one",
+             self.missed_samples),
+            ("ble_interval_jitter_seconds", "Standard deviation of the inter-arrival time", self.jitter),
+            ("ble_uptime_seconds", "Seconds since the receiver started", time.monotonic() - self.started),
+        ]
+        for name, help_text, value in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        lines += self.interval.render("ble_notification_interval_seconds", "Time between BLE notifications")
+        lines += self.upload_latency.render("ble_upload_latency_seconds", "Edge Impulse upload latency")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(metrics, port, host="127.0.0.1"):
+    """
+    Serves metrics.render_prometheus() on http://host:port/metrics from a daemon thread.
+
+    Returns:
+    - The running ThreadingHTTPServer (call .shutdown() to stop it).
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_port}/metrics", file=sys.stderr)
+    return server
@@ -0,0 +1,317 @@
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from session_io import read_session_csv, list_session_files
+
+# Python port of the Flutter app's live rep detector (WorkoutTracker.detectRep in lib/main.dart).
+#
+# Replays a session through the same logic the app runs on every BLE sample and produces the columns of the
+# app's workout_session_*.csv exports (Smoothed Z, Rep Detected, isIdle, Current Reps, Current Sets), so
+# detector changes can be regression-tested offline against Raw_data sessions and app exports.
+#
+# Everything that does not depend on earlier rep decisions is computed vectorized: baseline normalisation,
+# the 2 s idle test (sliding-window min/max via strided reductions), the 5-sample moving average and the
+# slope signs. Only the debounce / transition / set bookkeeping, which does depend on earlier reps, runs as
+# a scalar pass over plain Python lists.
+#
+#   python rep_detector.py replay Raw_data               # reps and sets per session
+#   python rep_detector.py diff WorkoutSucces.csv        # replay an app export and compare
+#   python rep_detector.py check Raw_data                # idle-transition parity with the Dart logic
+#
+# WorkoutSucces.csv (the export format with the Exercise column) replays exactly. Older exports such as
+# workout_session_2025-04-12T14-31-32-246207.csv were recorded with an earlier detector and diverge.
+
+# Constants from WorkoutTracker (lib/main.dart)
+SET_REST_THRESHOLD_MS = 5000
+MIN_REP_INTERVAL_MS = 1500
+TRANSITION_DELAY_MS = 1000
+Z_BASELINE = -9.65
+SMOOTHING_WINDOW_SIZE = 5
+IDLE_WINDOW_SIZE = 100
+IDLE_Z_THRESHOLD = 0.1
+Z_THRESHOLD = 0.5
+
+EXPORT_COLUMNS = ['Timestamp', 'Raw Z', 'Normalized Z', 'Smoothed Z', 'Rep Detected', 'isIdle',
+                  'Current Reps', 'Current Sets']
+
+
+def trailing_mean(values, window):
+    """Mean of the last `window` values (fewer at the start), summed oldest-first like zWindow.reduce in Dart."""
+    n = len(values)
+    index = np.arange(n)
+    start = np.maximum(index - (window - 1), 0)
+    total = values[start].copy()
+    for offset in range(1, window):
+        position = start + offset
+        total = np.where(position <= index, total + values[np.minimum(position, n - 1)], total)
+    return total / (index - start + 1)
+
+
+def trailing_range(values, window):
+    """max - min over the last `window` values; NaN until the window is full."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        view = sliding_window_view(values, window)
+        out[window - 1:] = view.max(axis=1) - view.min(axis=1)
+    return out
+
+
+def detector_features(z, time_us):
+    """
+    Per-sample quantities that do not depend on earlier rep decisions.
+
+    Parameters:
+    - z: Raw Z acceleration (m/s²).
+    - time_us: Sample times in integer microseconds. Durations are truncated to milliseconds after the
+      subtraction, like Dart's difference().inMilliseconds (flooring each time first is off by one sample at
+      the TRANSITION_DELAY_MS boundary).
+
+    Returns:
+    - dict of arrays: normalized, smoothed, is_idle, idle_transition (rep ignored during Idle-to-Exercise),
+      up (slope > 0), down (slope < 0).
+    """
+    z = np.asarray(z, dtype=np.float64)
+    n = len(z)
+    normalized = z - Z_BASELINE
+
+    # Idle test: isIdle starts true and is only re-evaluated once the 2 s window is full
+    window_range = trailing_range(normalized, IDLE_WINDOW_SIZE)
+    full = ~np.isnan(window_range)
+    is_idle = np.where(full, window_range < IDLE_Z_THRESHOLD, True)
+
+    # lastIdleTime: time of the most recent full-window idle sample
+    idle_index = np.where(full & is_idle, np.arange(n), -1)
+    idle_index = np.maximum.accumulate(idle_index) if n else idle_index
+    has_idle = idle_index >= 0
+    time_us = np.asarray(time_us, dtype=np.int64)
+    last_idle_us = np.where(has_idle, time_us[np.maximum(idle_index, 0)], 0)
+    idle_transition = has_idle & ~is_idle & ((time_us - last_idle_us) // 1000 < TRANSITION_DELAY_MS)
+
+    smoothed = trailing_mean(normalized, SMOOTHING_WINDOW_SIZE)
+    delta = np.diff(smoothed, prepend=np.nan)
+    return {
+        'normalized': normalized,
+        'smoothed': smoothed,
+        'is_idle': is_idle,
+        'idle_transition': idle_transition,
+        'up': delta > 0,
+        'down': delta < 0,
+    }
+
+
+def run_detector(timestamps, z):
+    """
+    Replays samples through the app's rep detector.
+
+    Parameters:
+    - timestamps: Sample times (datetime-like); the app uses the time each BLE notification was processed.
+    - z: Raw Z acceleration (m/s²).
+
+    Returns:
+    - DataFrame with the app's export columns (Timestamp, Raw Z, Normalized Z, Smoothed Z, Rep Detected,
+      isIdle, Current Reps, Current Sets).
+    """
+    timestamps = pd.to_datetime(pd.Series(timestamps)).reset_index(drop=True)
+    us = timestamps.to_numpy(dtype='datetime64[us]').astype(np.int64)
+    features = detector_features(z, us)
+    n = len(us)
+
+    rep_detected = [0] * n
+    current_reps = [0] * n
+    current_sets = [0] * n
+
+    # Scalar pass; Dart's Duration.inMilliseconds truncates, so differences are taken in microseconds
+    t_list = us.tolist()
+    smoothed = features['smoothed'].tolist()
+    up = features['up'].tolist()
+    down = features['down'].tolist()
+    idle_transition = features['idle_transition'].tolist()
+
+    last_rep_detection = None
+    last_rep = None
+    last_set = None
+    moving_up = False
+    reps = 0
+    sets = 0
+    for i in range(n):
+        now = t_list[i]
+        current_reps[i] = reps
+        current_sets[i] = sets
+        if last_rep_detection is not None and (now - last_rep_detection) // 1000 < MIN_REP_INTERVAL_MS:
+            continue
+        if idle_transition[i]:
+            continue
+        if last_set is not None and (now - last_set) // 1000 < TRANSITION_DELAY_MS:
+            continue
+
+        if i > 0:
+            sm = smoothed[i]
+            if moving_up and not up[i] and sm > Z_THRESHOLD:
+                reps += 1
+                last_rep = now
+                last_rep_detection = now
+                rep_detected[i] = 1
+                current_reps[i] = reps
+            if up[i] and sm > -Z_THRESHOLD:
+                moving_up = True
+            elif down[i] and sm < Z_THRESHOLD:
+                pass  # isMovingDown is set, isMovingUp keeps its value
+            else:
+                moving_up = False
+
+        if last_rep is not None and (now - last_rep) // 1000 > SET_REST_THRESHOLD_MS and reps > 0:
+            sets += 1
+            reps = 0
+            last_rep = None
+            last_set = now
+
+    return pd.DataFrame({
+        'Timestamp': timestamps,
+        'Raw Z': np.asarray(z, dtype=np.float64),
+        'Normalized Z': features['normalized'],
+        'Smoothed Z': features['smoothed'],
+        'Rep Detected': rep_detected,
+        'isIdle': features['is_idle'].astype(int),
+        'Current Reps': current_reps,
+        'Current Sets': current_sets,
+    })
+
+
+def reference_idle_transition(z, time_us):
+    """
+    Sample-by-sample transcription of the idle / Idle-to-Exercise bookkeeping of detectRep (lib/main.dart),
+    used to check the vectorized detector_features against the Dart semantics.
+    """
+    window = []
+    is_idle = True
+    last_idle_us = None
+    out = []
+    for value, now in zip(np.asarray(z, dtype=np.float64) - Z_BASELINE, time_us):
+        window.append(value)
+        if len(window) > IDLE_WINDOW_SIZE:
+            window.pop(0)
+        if len(window) == IDLE_WINDOW_SIZE:
+            if max(window) - min(window) < IDLE_Z_THRESHOLD:
+                is_idle = True
+                last_idle_us = now
+            else:
+                is_idle = False
+        # now.difference(lastIdleTime).inMilliseconds truncates the microsecond difference
+        out.append(last_idle_us is not None and not is_idle
+                   and int((now - last_idle_us) / 1000) < TRANSITION_DELAY_MS)
+    return np.array(out, dtype=bool)
+
+
+def check_transition_boundary():
+    """
+    Parity check at the TRANSITION_DELAY_MS boundary: the last idle sample at 1.9996 s and a moving sample
+    999.8 ms later, at 2.9994 s. Dart truncates the 999.8 ms difference to 999 (still in transition);
+    flooring both times first gives 2999 - 1999 = 1000 ms (no longer in transition).
+
+    Returns:
+    - True if detector_features and the Dart transcription agree and report the sample as a transition.
+    """
+    step_us = 20_000
+    time_us = np.arange(IDLE_WINDOW_SIZE + 60, dtype=np.int64) * step_us + 600  # 1.9996 s = sample 99
+    z = np.full(len(time_us), Z_BASELINE)
+    z[IDLE_WINDOW_SIZE:] += 2 * IDLE_Z_THRESHOLD  # moving from the first sample after the idle window
+    boundary = int(np.searchsorted(time_us, time_us[IDLE_WINDOW_SIZE - 1] + 999_800))
+    time_us[boundary] = time_us[IDLE_WINDOW_SIZE - 1] + 999_800
+    vectorized = detector_features(z, time_us)['idle_transition']
+    reference = reference_idle_transition(z, time_us)
+    return bool((vectorized == reference).all() and vectorized[boundary])
+
+
+def replay_session(file_path):
+    """Runs a Raw/Cleaned/Labeled session CSV (Timestamp, Z columns) through the detector."""
+    df = read_session_csv(file_path)
+    df = df[df['Timestamp'].notna()]
+    return run_detector(df['Timestamp'], df['Z'].to_numpy())
+
+
+def session_totals(detected):
+    """Total reps and completed sets of a detector output (reps of an unfinished last set included)."""
+    rep_count = int(detected['Rep Detected'].sum())
+    set_count = int(detected['Current Sets'].iloc[-1]) if len(detected) else 0
+    return rep_count, set_count
+
+
+def diff_against_export(export_df, atol=1e-9):
+    """
+    Replays an app export (workout_session_*.csv / WorkoutSucces.csv) from its Timestamp and Raw Z columns
+    and compares the result column by column.
+
+    Returns:
+    - dict {column: number of mismatching rows}, plus 'first_mismatch' (row index or None).
+    """
+    export_df = export_df.reset_index(drop=True)
+    replayed = run_detector(export_df['Timestamp'], export_df['Raw Z'].to_numpy())
+    mismatches = {}
+    first = None
+    for column in EXPORT_COLUMNS[2:]:
+        expected = export_df[column].to_numpy(dtype=np.float64)
+        actual = replayed[column].to_numpy(dtype=np.float64)
+        bad = ~np.isclose(expected, actual, rtol=0, atol=atol)
+        mismatches[column] = int(bad.sum())
+        if bad.any():
+            index = int(np.argmax(bad))
+            first = index if first is None else min(first, index)
+    mismatches['first_mismatch'] = first
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline replay of the app's rep detector")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay = commands.add_parser("replay", help="Run sessions through the detector and report reps/sets")
+    replay.add_argument("paths", nargs="*", help="Session CSVs or directories")
+    replay.add_argument("--where", default=None,
+                        help="Select sessions from the catalogue instead, e.g. 'exercise=Squat rate_hz=50'")
+    replay.add_argument("--catalog", default=None, help="Catalogue database (default: session_catalog.DEFAULT_DB)")
+    replay.add_argument("--out", default=None, help="Write the detector output of a single session to this CSV")
+    diff = commands.add_parser("diff", help="Replay app exports and compare against what the app logged")
+    diff.add_argument("paths", nargs="+", help="workout_session_*.csv / WorkoutSucces.csv exports")
+    check = commands.add_parser("check", help="Compare the vectorized idle transition with the Dart logic")
+    check.add_argument("paths", nargs="*", help="Session CSVs or directories to compare as well")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        ok = check_transition_boundary()
+        print(f"TRANSITION_DELAY_MS boundary: {'OK' if ok else 'MISMATCH'}")
+        for path in list_session_files(args.paths):
+            df = read_session_csv(path)
+            df = df[df['Timestamp'].notna()]
+            time_us = df['Timestamp'].to_numpy(dtype='datetime64[us]').astype(np.int64)
+            z = df['Z'].to_numpy()
+            bad = int((detector_features(z, time_us)['idle_transition'] != reference_idle_transition(z, time_us)).sum())
+            ok &= bad == 0
+            print(f"{path}: {'OK' if bad == 0 else f'{bad} mismatching samples'}")
+        sys.exit(0 if ok else 1)
+
+    if getattr(args, 'where', None) is not None:
+        from session_catalog import SessionCatalog, DEFAULT_DB
+        with SessionCatalog(args.catalog or DEFAULT_DB) as catalog:
+            files = catalog.paths(args.where)
+    else:
+        files = list_session_files(args.paths)
+    if getattr(args, 'out', None) and len(files) > 1:
+        parser.error(f"--out writes a single session, but {len(files)} were selected")
+
+    failed = False
+    for path in files:
+        if args.command == "replay":
+            detected = replay_session(path)
+            rep_count, set_count = session_totals(detected)
+            print(f"{path}: {rep_count} reps, {set_count} sets ({len(detected)} samples)")
+            if args.out:
+                detected.to_csv(args.out, index=False)
+        else:
+            result = diff_against_export(pd.read_csv(path))
+            first = result.pop('first_mismatch')
+            status = "OK" if first is None else f"MISMATCH from row {first}"
+            failed |= first is not None
+            print(f"{path}: {status} {result}")
+    sys.exit(1 if failed else 0)
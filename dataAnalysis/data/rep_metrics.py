@@ -0,0 +1,171 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from session_io import read_session_csv, list_session_files
+
+# Per-rep kinematics of labeled sessions (Set_Number / Rep_Number columns, as written by dataAnalysis1).
+#
+# Rows are sorted once by (Set_Number, Rep_Number) with a stable sort, so every rep becomes one contiguous
+# segment of the sorted arrays; all metrics are then segmented reductions (np.ufunc.reduceat) over those
+# segments instead of a DataFrame filter per set and rep.
+#
+#   python rep_metrics.py old_data --out rep_metrics.parquet
+#
+# Metrics per rep:
+#   duration            first to last sample (s)
+#   peak_magnitude      max acceleration magnitude, mean_magnitude its mean
+#   time_to_peak        rep start to the (first) peak magnitude (s)
+#   concentric          time_to_peak / duration, eccentric = 1 - concentric
+#   peak_velocity       max |v|, v integrated from magnitude minus gravity (the session's median magnitude)
+#                       within the rep; a relative effort estimate, not a calibrated bar speed
+
+METRIC_COLUMNS = ['set_number', 'rep_number', 'num_points', 'start', 'duration', 'peak_magnitude',
+                  'mean_magnitude', 'time_to_peak', 'concentric', 'eccentric', 'peak_velocity', 'mean_velocity']
+
+
+def rep_segments(set_numbers, rep_numbers):
+    """
+    Groups the rows of each (set, rep) into contiguous segments with a single stable sort.
+
+    Parameters:
+    - set_numbers, rep_numbers: Per-row labels; rows with a label <= 0 are not part of any rep.
+
+    Returns:
+    - order: Row indices sorted by (set, rep), time order kept within a rep (labeled rows only).
+    - starts: Offset of every segment in `order`.
+    - counts: Rows per segment.
+    - set_ids, rep_ids: Labels of every segment.
+    """
+    set_numbers = np.asarray(set_numbers, dtype=np.int64)
+    rep_numbers = np.asarray(rep_numbers, dtype=np.int64)
+    labeled = np.flatnonzero((set_numbers > 0) & (rep_numbers > 0))
+    if not len(labeled):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty, empty
+    key = set_numbers[labeled] * (int(rep_numbers[labeled].max()) + 1) + rep_numbers[labeled]
+    order_in_labeled = np.argsort(key, kind='stable')
+    order = labeled[order_in_labeled]
+    key = key[order_in_labeled]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+    return order, starts, counts, set_numbers[order[starts]], rep_numbers[order[starts]]
+
+
+def _seconds(df):
+    if 'Timestamp' in df.columns:
+        timestamps = pd.to_datetime(df['Timestamp'])
+        return (timestamps - timestamps.iloc[0]).dt.total_seconds().to_numpy()
+    return np.asarray(df.index, dtype=np.float64)
+
+
+def _magnitude(df):
+    if 'Magnitude' in df.columns:
+        return df['Magnitude'].to_numpy(dtype=np.float64)
+    return np.sqrt((df[['X', 'Y', 'Z']].to_numpy(dtype=np.float64) ** 2).sum(axis=1))
+
+
+def rep_metrics(df, gravity=None):
+    """
+    Kinematics of every rep of a labeled session in one pass.
+
+    Parameters:
+    - df: DataFrame with Set_Number, Rep_Number, a time base ('Timestamp' column, else a seconds index) and
+      'Magnitude' (or X, Y, Z to compute it).
+    - gravity: Magnitude at rest, subtracted before integrating velocity (default: median magnitude of df).
+
+    Returns:
+    - DataFrame with METRIC_COLUMNS, one row per rep ordered by (set_number, rep_number).
+    """
+    order, starts, counts, set_ids, rep_ids = rep_segments(df['Set_Number'], df['Rep_Number'])
+    if not len(order):
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+    magnitude_all = _magnitude(df)
+    if gravity is None:
+        gravity = float(np.median(magnitude_all))
+    t = _seconds(df)[order]
+    magnitude = magnitude_all[order]
+    segment = np.repeat(np.arange(len(starts)), counts)
+
+    t_start = np.minimum.reduceat(t, starts)
+    duration = np.maximum.reduceat(t, starts) - t_start
+    peak = np.maximum.reduceat(magnitude, starts)
+    mean = np.add.reduceat(magnitude, starts) / counts
+
+    # First row of each segment reaching its peak
+    position = np.arange(len(order))
+    peak_row = np.minimum.reduceat(np.where(magnitude == peak[segment], position, len(order)), starts)
+    time_to_peak = t[peak_row] - t_start
+    with np.errstate(invalid='ignore', divide='ignore'):
+        concentric = np.where(duration > 0, time_to_peak / duration, np.nan)
+
+    # Segmented cumulative integral of the linear acceleration (rectangle rule, dt = 0 at each rep start)
+    dt = np.diff(t, prepend=t[0])
+    dt[starts] = 0.0
+    dv = (magnitude - gravity) * dt
+    cumulative = np.cumsum(dv)
+    velocity = cumulative - (cumulative[starts] - dv[starts])[segment]
+    speed = np.abs(velocity)
+
+    return pd.DataFrame({
+        'set_number': set_ids,
+        'rep_number': rep_ids,
+        'num_points': counts,
+        'start': t_start,
+        'duration': duration,
+        'peak_magnitude': peak,
+        'mean_magnitude': mean,
+        'time_to_peak': time_to_peak,
+        'concentric': concentric,
+        'eccentric': 1 - concentric,
+        'peak_velocity': np.maximum.reduceat(speed, starts),
+        'mean_velocity': np.add.reduceat(speed, starts) / counts,
+    })
+
+
+def archive_rep_metrics(paths, workers=4):
+    """
+    rep_metrics for every labeled file (with Rep_Number / Set_Number) among paths, as one table.
+
+    Returns:
+    - DataFrame with a 'session' column (file name) followed by METRIC_COLUMNS.
+    """
+    def load(file_path):
+        df = read_session_csv(file_path)
+        if 'Rep_Number' not in df.columns or 'Set_Number' not in df.columns:
+            return None
+        metrics = rep_metrics(df)
+        metrics.insert(0, 'session', os.path.basename(file_path))
+        return metrics
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tables = [table for table in pool.map(load, list_session_files(paths)) if table is not None]
+    if not tables:
+        return pd.DataFrame(columns=['session'] + METRIC_COLUMNS)
+    table = pd.concat(tables, ignore_index=True)
+    table['session'] = table['session'].astype('category')
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-rep kinematics of labeled sessions")
+    parser.add_argument("paths", nargs="+", help="Labeled session CSVs or directories")
+    parser.add_argument("--out", default=None, help="Write the table to this .csv or .parquet file")
+    parser.add_argument("--workers", type=int, default=4, help="Files loaded concurrently")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = archive_rep_metrics(args.paths, args.workers)
+    print(f"{len(table)} reps from {table['session'].nunique()} sessions in {time.perf_counter() - start:.2f}s",
+          file=sys.stderr)
+    if args.out and args.out.endswith('.parquet'):
+        table.to_parquet(args.out, index=False)
+    elif args.out:
+        table.to_csv(args.out, index=False)
+    else:
+        with pd.option_context('display.width', 200, 'display.max_columns', 20):
+            print(table.round(3).to_string(index=False))
@@ -0,0 +1,315 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+
+from session_io import read_session_csv, list_session_files, session_stem
+
+# Template-matching rep search.
+#
+# Every labeled rep (a Rep_Number > 0 segment, as written by dataAnalysis1.save_labeled_data) is a template.
+# A session is scanned for subsequences that match a template under z-normalised, Sakoe-Chiba banded DTW,
+# which does not depend on the Z profile having clear peaks (rows, curls with a flat Z axis).
+#
+# The search follows the usual subsequence-DTW cascade; each step only sees the survivors of the previous one:
+#   1. window mean / std of every subsequence from cumulative sums (flat windows are skipped),
+#   2. LB_Kim on the first and last points,
+#   3. LB_Keogh against the template's band envelope, evaluated for blocks of windows at once,
+#   4. banded DTW for all survivors together, row by row, abandoning candidates above the threshold.
+# Templates are searched in parallel and overlapping matches are resolved greedily by distance.
+#
+#   python rep_search.py Raw_data/Squats4_50Hz_2025-04-06T18-23-30.226394.csv --templates old_data
+#   python rep_search.py old_data/bicep_curl1_labeled.csv --templates old_data --column Magnitude
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEMPLATE_DIRS = [os.path.join(DATA_DIR, "old_data"), os.path.join(DATA_DIR, "Labeled_data")]
+
+BAND_FRACTION = 0.1  # Sakoe-Chiba radius as a fraction of the template length
+MAX_DISTANCE = 0.25  # Accepted DTW distance per sample (z-normalised; unrelated signals score about 2)
+MIN_STD = 0.05  # Windows flatter than this (in signal units) are not considered
+MAX_OVERLAP = 0.25  # Allowed overlap between accepted matches, as a fraction of the shorter one
+LB_BLOCK = 4096  # Windows per LB_Keogh block
+
+
+@dataclass
+class Template:
+    name: str  # "<file>#<rep number>"
+    values: np.ndarray  # z-normalised signal
+
+
+@dataclass
+class SearchResult:
+    start: int
+    end: int  # exclusive
+    distance: float
+    template: str
+
+
+def session_signal(df, column='Z'):
+    """1-D signal of a session: one of the X, Y, Z columns, or 'Magnitude' of all three."""
+    if column == 'Magnitude':
+        return np.sqrt((df[['X', 'Y', 'Z']].to_numpy(dtype=np.float64) ** 2).sum(axis=1))
+    return df[column].to_numpy(dtype=np.float64)
+
+
+def znorm(values):
+    values = np.asarray(values, dtype=np.float64)
+    return (values - values.mean()) / max(values.std(), 1e-12)
+
+
+def load_templates(paths, column='Z', min_length=10, max_length=500):
+    """
+    Collects the labeled reps of every file with a Rep_Number column as z-normalised templates.
+
+    Parameters:
+    - paths: Labeled CSVs or directories; files without Rep_Number are ignored.
+    - column: Signal used for matching (see session_signal).
+    - min_length, max_length: Reps outside this many samples are dropped (unfinished or mislabeled reps), as are
+      reps more than twice as long as the file's median rep.
+
+    Returns:
+    - List of Template; identical reps (e.g. the same session exported twice) are included once.
+    """
+    templates = []
+    seen = set()
+    for file_path in list_session_files(paths):
+        try:
+            df = read_session_csv(file_path, parse_dates=False)
+        except (ValueError, pd.errors.ParserError):
+            continue
+        if 'Rep_Number' not in df.columns:
+            continue
+        signal = session_signal(df, column)
+        reps = df['Rep_Number'].to_numpy()
+        # Contiguous runs of the same rep number
+        boundaries = np.flatnonzero(np.diff(reps)) + 1
+        segments = [(start, end) for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(reps)])
+                    if reps[start] > 0 and min_length <= end - start <= max_length]
+        if not segments:
+            continue
+        # Segments much longer than the file's typical rep cover several reps
+        typical = np.median([end - start for start, end in segments])
+        for start, end in segments:
+            if end - start > 2 * typical:
+                continue
+            key = np.round(signal[start:end], 3).tobytes()
+            if key in seen:
+                continue
+            seen.add(key)
+            templates.append(Template(f"{os.path.basename(file_path)}#{reps[start]}", znorm(signal[start:end])))
+    return templates
+
+
+def envelope(values, radius):
+    """Upper and lower LB_Keogh envelope: running max / min over +-radius samples."""
+    padded_max = np.pad(values, radius, mode='constant', constant_values=-np.inf)
+    padded_min = np.pad(values, radius, mode='constant', constant_values=np.inf)
+    return (sliding_window_view(padded_max, 2 * radius + 1).max(axis=1),
+            sliding_window_view(padded_min, 2 * radius + 1).min(axis=1))
+
+
+def dtw_batch(candidates, query, radius, limit, remaining=None):
+    """
+    Banded DTW (squared cost) between every row of `candidates` and `query`, with early abandoning.
+
+    Each row of the cost matrix is computed for all candidates at once. Within a row the recurrence
+    D[i, j] = c[i, j] + min(D[i-1, j-1], D[i-1, j], D[i, j-1]) is a min-plus prefix scan, so with
+    S = cumsum(c) it becomes D[i, j] = S[j] + cummin(a[k] - S[k-1]), a[k] = min(D[i-1, k-1], D[i-1, k]).
+
+    Parameters:
+    - candidates: (n, m) array.
+    - query: (m,) array.
+    - radius: Sakoe-Chiba band radius.
+    - limit: Candidates whose distance provably exceeds this are abandoned.
+    - remaining: Optional (n, m) lower bounds on the cost of rows i..m-1 (e.g. cumulative LB_Keogh),
+      used to abandon earlier.
+
+    Returns:
+    - Distances; abandoned candidates get np.inf.
+    """
+    n, m = candidates.shape
+    result = np.full(n, np.inf)
+    alive = np.arange(n)
+    previous = np.full((n, m + 1), np.inf)  # column 0 is the D[i, -1] = inf border
+    previous[:, 0] = 0.0  # D[-1, -1] = 0
+    for i in range(m):
+        lo, hi = max(0, i - radius), min(m, i + radius + 1)
+        cost = (candidates[alive, i, None] - query[None, lo:hi]) ** 2
+        diagonal_or_up = np.minimum(previous[:, lo:hi], previous[:, lo + 1:hi + 1])
+        cumulative = np.cumsum(cost, axis=1)
+        shifted = np.concatenate([np.zeros((len(alive), 1)), cumulative[:, :-1]], axis=1)
+        row = cumulative + np.minimum.accumulate(diagonal_or_up - shifted, axis=1)
+
+        current = np.full((len(alive), m + 1), np.inf)
+        current[:, lo + 1:hi + 1] = row
+        bound = row.min(axis=1)
+        if remaining is not None and i + 1 < m:
+            bound = bound + remaining[alive, i + 1]
+        keep = bound <= limit
+        if not keep.all():
+            alive, current = alive[keep], current[keep]
+            if not len(alive):
+                return result
+        previous = current
+    result[alive] = previous[:, m]
+    return result
+
+
+def search_template(signal, template, max_distance=MAX_DISTANCE, band=BAND_FRACTION, min_std=MIN_STD):
+    """
+    All subsequences of `signal` within max_distance (DTW per sample) of one template.
+
+    Returns:
+    - (starts, distances) arrays.
+    """
+    query = template.values
+    m = len(query)
+    if len(signal) < m:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    radius = max(int(m * band), 1)
+    limit = max_distance * m
+
+    # 1. Mean / std of every window from cumulative sums
+    cs = np.concatenate([[0.0], np.cumsum(signal)])
+    cs2 = np.concatenate([[0.0], np.cumsum(signal ** 2)])
+    mean = (cs[m:] - cs[:-m]) / m
+    std = np.sqrt(np.maximum((cs2[m:] - cs2[:-m]) / m - mean ** 2, 0.0))
+    starts = np.flatnonzero(std >= min_std)
+
+    # 2. LB_Kim: first and last points are always aligned
+    first = (signal[starts] - mean[starts]) / std[starts]
+    last = (signal[starts + m - 1] - mean[starts]) / std[starts]
+    starts = starts[(first - query[0]) ** 2 + (last - query[-1]) ** 2 <= limit]
+
+    # 3. LB_Keogh
+    upper, lower = envelope(query, radius)
+    windows = sliding_window_view(signal, m)
+    survivors = []
+    for block in range(0, len(starts), LB_BLOCK):
+        index = starts[block:block + LB_BLOCK]
+        normalized = (windows[index] - mean[index, None]) / std[index, None]
+        contributions = np.maximum(normalized - upper, 0) ** 2 + np.maximum(lower - normalized, 0) ** 2
+        # remaining[:, i]: bound on the cost of rows i.. of any warping path
+        remaining = np.cumsum(contributions[:, ::-1], axis=1)[:, ::-1]
+        keep = remaining[:, 0] <= limit
+        survivors.append((index[keep], normalized[keep], remaining[keep]))
+    if not survivors:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    starts = np.concatenate([s for s, _, _ in survivors])
+    normalized = np.concatenate([w for _, w, _ in survivors])
+    remaining = np.concatenate([r for _, _, r in survivors])
+
+    # 4. Banded DTW, abandoning once the cost so far plus the LB_Keogh bound of the remaining rows exceeds limit
+    distances = dtw_batch(normalized, query, radius, limit, remaining) / m
+    found = distances <= max_distance
+    return starts[found], distances[found]
+
+
+def _search_templates(signal, templates, max_distance, band, min_std):
+    results = []
+    for template in templates:
+        starts, distances = search_template(signal, template, max_distance, band, min_std)
+        results.append((template.name, len(template.values), starts, distances))
+    return results
+
+
+def select_matches(candidates, max_overlap=MAX_OVERLAP):
+    """Greedy non-maximum suppression: best distance first, dropping matches overlapping an accepted one."""
+    accepted = []
+    taken = []  # (start, end) of accepted matches
+    for match in sorted(candidates, key=lambda c: c.distance):
+        length = match.end - match.start
+        if all(min(match.end, e) - max(match.start, s) <= max_overlap * min(length, e - s) for s, e in taken):
+            accepted.append(match)
+            taken.append((match.start, match.end))
+    return sorted(accepted, key=lambda c: c.start)
+
+
+def search_reps(signal, templates, max_distance=MAX_DISTANCE, band=BAND_FRACTION, min_std=MIN_STD,
+                max_overlap=MAX_OVERLAP, workers=None):
+    """
+    Finds rep occurrences in a session signal.
+
+    Parameters:
+    - signal: 1-D session signal (see session_signal).
+    - templates: Templates from load_templates.
+    - max_distance: Accepted DTW distance per sample.
+    - band: Warping band as a fraction of each template's length.
+    - min_std: Windows with a lower standard deviation are skipped.
+    - max_overlap: Allowed overlap between matches, as a fraction of the shorter match.
+    - workers: Processes searching templates in parallel (None: one per CPU, 1: search in this process).
+
+    Returns:
+    - List of SearchResult, in time order.
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+    groups = [templates[i::workers] for i in range(min(workers, len(templates)))]
+    if workers > 1 and len(groups) > 1:
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [pool.submit(_search_templates, signal, group, max_distance, band, min_std) for group in groups]
+            per_template = [result for future in futures for result in future.result()]
+    else:
+        per_template = _search_templates(signal, templates, max_distance, band, min_std)
+
+    candidates = []
+    for name, length, starts, distances in per_template:
+        # Within one template keep only local minima of the distance, neighbouring shifts are the same rep
+        order = np.argsort(distances)
+        best = np.zeros(len(signal) + length, dtype=bool)
+        for k in order.tolist():
+            s = int(starts[k])
+            if not best[s:s + max(length // 2, 1)].any() and not best[max(s - length // 2, 0):s].any():
+                best[s] = True
+                candidates.append(SearchResult(s, s + length, float(distances[k]), name))
+    return select_matches(candidates, max_overlap)
+
+
+def matches_to_frame(matches, timestamps=None):
+    """SearchResult list as a DataFrame (with start / end times if timestamps are given)."""
+    df = pd.DataFrame([vars(m) for m in matches], columns=['start', 'end', 'distance', 'template'])
+    if timestamps is not None and len(df):
+        times = pd.Series(pd.to_datetime(timestamps)).reset_index(drop=True)
+        df['start_time'] = times.iloc[df['start']].to_numpy()
+        df['duration'] = (times.iloc[df['end'] - 1].to_numpy() - df['start_time']) / np.timedelta64(1, 's')
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find reps in sessions by DTW template matching")
+    parser.add_argument("paths", nargs="+", help="Session CSVs or directories to search")
+    parser.add_argument("--templates", nargs="+", default=DEFAULT_TEMPLATE_DIRS,
+                        help="Labeled CSVs / directories with Rep_Number segments (default: old_data, Labeled_data)")
+    parser.add_argument("--column", default="Z", help="Signal to match: X, Y, Z or Magnitude")
+    parser.add_argument("--max-distance", type=float, default=MAX_DISTANCE, help="Accepted DTW distance per sample")
+    parser.add_argument("--band", type=float, default=BAND_FRACTION, help="Warping band (fraction of template length)")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel processes (default: CPU count)")
+    parser.add_argument("--out", default=None, help="Write the matches of a single session to this CSV")
+    args = parser.parse_args()
+
+    files = list_session_files(args.paths)
+    if args.out and len(files) > 1:
+        parser.error(f"--out writes a single session, but {len(files)} were selected")
+
+    templates = load_templates(args.templates, args.column)
+    if not templates:
+        print("Error: No templates found (files need a Rep_Number column).")
+        sys.exit(1)
+    print(f"{len(templates)} templates", file=sys.stderr)
+
+    for path in files:
+        df = read_session_csv(path)
+        start = time.perf_counter()
+        # A session is not matched against its own reps, nor those of its _cleaned / _labeled copies
+        own = session_stem(path)
+        matches = search_reps(session_signal(df, args.column),
+                              [t for t in templates if session_stem(t.name.rsplit('#', 1)[0]) != own],
+                              args.max_distance, args.band, workers=args.workers)
+        print(f"{path}: {len(matches)} reps ({time.perf_counter() - start:.2f}s)")
+        if args.out:
+            matches_to_frame(matches, df['Timestamp']).to_csv(args.out, index=False)
@@ -0,0 +1,299 @@
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+
+from session_io import parse_session_text, parse_session_filename, canonical_exercise, list_session_files
+from rep_detector import run_detector, session_totals
+
+# SQLite catalogue of the recording archive (Raw_data, Cleaned_data, Labeled_data, ...).
+#
+# The archive encodes exercise, take, rate and recording time only in file names, so every script used to
+# hard-code or glob paths and re-parse files to learn anything about them. scan() reads each CSV once and
+# stores its metadata; later scans only re-read files whose size or mtime changed.
+#
+#   python session_catalog.py scan                                     # index the archive next to this file
+#   python session_catalog.py query "exercise=Squat rate_hz=50 after=2025-04-01"
+#
+#   catalog = SessionCatalog()
+#   paths = catalog.paths("exercise=Squat rate_hz=50 after=2025-04-01 kind=labeled")
+
+DEFAULT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(DEFAULT_ROOT, "sessions.db")
+ARCHIVE_DIRS = ("Raw_data", "Cleaned_data", "Labeled_data")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    path TEXT PRIMARY KEY,          -- relative to the catalogue root, '/'-separated
+    kind TEXT,                      -- raw, cleaned or labeled (from the folder / file suffix)
+    exercise TEXT,                  -- canonical label (Squat, BicepCurl, BarbellRows, Deadlift, Unknown)
+    exercise_name TEXT,             -- as spelled in the file name
+    take INTEGER,
+    rate_hz INTEGER,                -- nominal rate from the file name (NULL if not in the name)
+    recorded_at TEXT,               -- ISO timestamp from the file name
+    start_time TEXT,                -- first / last sample timestamps (NULL if unparseable)
+    end_time TEXT,
+    duration_s REAL,
+    sample_count INTEGER,
+    measured_rate_hz REAL,          -- 1 / median sample interval
+    rep_count INTEGER,              -- from Rep_Number labels (NULL if the file has none)
+    set_count INTEGER,              -- from Set_Number labels (NULL if the file has none)
+    detector_reps INTEGER,          -- replay of the app's live detector (rep_detector.py)
+    detector_sets INTEGER,
+    columns TEXT,
+    sha1 TEXT,
+    size INTEGER,
+    mtime REAL,
+    parent_path TEXT,               -- file this one was derived from (e.g. X_labeled.csv -> X.csv)
+    indexed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_exercise ON sessions (exercise, rate_hz, recorded_at);
+CREATE INDEX IF NOT EXISTS sessions_sha1 ON sessions (sha1);
+"""
+
+# Query keys accepted by parse_query() -> SQL condition on the sessions table
+_QUERY_FIELDS = {
+    'exercise': "exercise = ? COLLATE NOCASE",
+    'kind': "kind = ?",
+    'rate_hz': "rate_hz = ?",
+    'take': "take = ?",
+    'after': "recorded_at >= ?",
+    'before': "recorded_at < ?",
+    'min_duration': "duration_s >= ?",
+    'max_duration': "duration_s <= ?",
+    'path': "path LIKE ?",
+}
+
+
+def _session_kind(rel_path, suffix):
+    if suffix:
+        return suffix.strip('_').split('_')[-1]
+    folder = rel_path.split('/')[0].lower()
+    return {'raw_data': 'raw', 'cleaned_data': 'cleaned', 'labeled_data': 'labeled'}.get(folder, 'raw')
+
+
+def _positive_count(df, column):
+    if column not in df.columns:
+        return None
+    values = df[column].to_numpy()
+    return int(np.unique(values[values > 0]).size)
+
+
+def describe_session(text, file_path):
+    """Metadata of one session CSV (contents already read), as a dict of sessions-table columns."""
+    meta = parse_session_filename(file_path) or {}
+    df = parse_session_text(text, file_path=file_path)
+    timestamps = df['Timestamp'].dropna()
+    record = {
+        'exercise_name': meta.get('exercise'),
+        'exercise': canonical_exercise(meta.get('exercise')),
+        'take': meta.get('take'),
+        'rate_hz': meta.get('rate_hz'),
+        'recorded_at': meta['recorded_at'].isoformat() if meta.get('recorded_at') is not None else None,
+        'sample_count': len(df),
+        'columns': ','.join(df.columns),
+        'rep_count': _positive_count(df, 'Rep_Number'),
+        'set_count': _positive_count(df, 'Set_Number'),
+        'start_time': None, 'end_time': None, 'duration_s': None, 'measured_rate_hz': None,
+        'detector_reps': None, 'detector_sets': None,
+    }
+    if len(timestamps) > 1:
+        record['start_time'] = timestamps.iloc[0].isoformat()
+        record['end_time'] = timestamps.iloc[-1].isoformat()
+        record['duration_s'] = (timestamps.iloc[-1] - timestamps.iloc[0]).total_seconds()
+        median_dt = timestamps.diff().dt.total_seconds().median()
+        record['measured_rate_hz'] = 1 / median_dt if median_dt > 0 else None
+        detected = run_detector(timestamps, df.loc[timestamps.index, 'Z'].to_numpy())
+        record['detector_reps'], record['detector_sets'] = session_totals(detected)
+    return record
+
+
+def parse_query(query):
+    """
+    Parses "key=value key=value ..." into a SQL WHERE clause and parameters.
+
+    Keys: exercise, kind, rate_hz, take, after, before (dates compared with the file-name timestamp),
+    min_duration, max_duration (seconds) and path (SQL LIKE pattern).
+    """
+    conditions, params = [], []
+    for term in (query or '').split():
+        key, sep, value = term.partition('=')
+        if not sep or key not in _QUERY_FIELDS:
+            raise ValueError(f"Invalid query term '{term}' (expected one of {', '.join(_QUERY_FIELDS)} as key=value)")
+        if key == 'exercise':
+            value = canonical_exercise(value, default=value)
+        elif key in ('after', 'before'):
+            value = pd.Timestamp(value).isoformat()
+        elif key in ('rate_hz', 'take'):
+            value = int(value)
+        elif key in ('min_duration', 'max_duration'):
+            value = float(value)
+        conditions.append(_QUERY_FIELDS[key])
+        params.append(value)
+    return (' AND '.join(conditions) or '1'), params
+
+
+class SessionCatalog:
+    """
+    SQLite-backed index of session CSVs.
+
+    Parameters:
+    - db_path: Catalogue database (created if missing).
+    - root: Archive root; paths are stored relative to it.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, root=DEFAULT_ROOT):
+        self.root = os.path.abspath(root)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+
+    def scan(self, dirs=ARCHIVE_DIRS, verbose=False):
+        """
+        Indexes new and changed CSVs under root/dirs and drops entries whose file disappeared.
+
+        Returns:
+        - (added_or_updated, unchanged, removed) counts.
+        """
+        known = {row['path']: (row['size'], row['mtime'])
+                 for row in self.connection.execute("SELECT path, size, mtime FROM sessions")}
+        seen = set()
+        updated = unchanged = 0
+        for directory in dirs:
+            folder = os.path.join(self.root, directory)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                if not name.endswith('.csv'):
+                    continue
+                full_path = os.path.join(folder, name)
+                rel_path = self._relative(full_path)
+                seen.add(rel_path)
+                stat = os.stat(full_path)
+                if known.get(rel_path) == (stat.st_size, stat.st_mtime):
+                    unchanged += 1
+                    continue
+                self._index_file(full_path, rel_path, stat)
+                updated += 1
+                if verbose:
+                    print(f"Indexed {rel_path}", file=sys.stderr)
+
+        removed = [path for path in known if path not in seen]
+        self.connection.executemany("DELETE FROM sessions WHERE path = ?", [(path,) for path in removed])
+        self._link_parents()
+        self.connection.commit()
+        return updated, unchanged, len(removed)
+
+    def _index_file(self, full_path, rel_path, stat):
+        with open(full_path, 'rb') as f:
+            raw = f.read()
+        record = {'path': rel_path, 'sha1': hashlib.sha1(raw).hexdigest(), 'size': stat.st_size,
+                  'mtime': stat.st_mtime, 'indexed_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'parent_path': None}
+        meta = parse_session_filename(full_path) or {}
+        record['kind'] = _session_kind(rel_path, meta.get('suffix'))
+        try:
+            record.update(describe_session(raw.decode('utf-8', errors='replace'), full_path))
+        except (ValueError, KeyError, pd.errors.ParserError) as e:
+            print(f"Could not read {rel_path}: {e}", file=sys.stderr)
+        columns = ', '.join(record)
+        placeholders = ', '.join('?' * len(record))
+        self.connection.execute(f"INSERT OR REPLACE INTO sessions ({columns}) VALUES ({placeholders})",
+                                list(record.values()))
+
+    def _link_parents(self):
+        """Derived files are named after their source plus a suffix: X_labeled_cleaned.csv <- X_labeled.csv <- X.csv."""
+        rows = self.connection.execute("SELECT path FROM sessions").fetchall()
+        by_stem = {}
+        for row in rows:
+            by_stem.setdefault(os.path.splitext(os.path.basename(row['path']))[0], []).append(row['path'])
+        links = []
+        for row in rows:
+            stem = os.path.splitext(os.path.basename(row['path']))[0]
+            parent = None
+            while parent is None and '_' in stem:
+                stem, _, suffix = stem.rpartition('_')
+                if not suffix.isalpha():
+                    break
+                candidates = by_stem.get(stem)
+                parent = sorted(candidates)[0] if candidates else None
+            links.append((parent, row['path']))
+        self.connection.executemany("UPDATE sessions SET parent_path = ? WHERE path = ?", links)
+
+    def query(self, query='', order_by='recorded_at, path'):
+        """Sessions matching a parse_query() string, as a DataFrame of sessions-table columns."""
+        where, params = parse_query(query)
+        return pd.read_sql_query(f"SELECT * FROM sessions WHERE {where} ORDER BY {order_by}",
+                                 self.connection, params=params)
+
+    def paths(self, query=''):
+        """Absolute paths of the sessions matching a parse_query() string."""
+        where, params = parse_query(query)
+        rows = self.connection.execute(f"SELECT path FROM sessions WHERE {where} ORDER BY recorded_at, path", params)
+        return [os.path.join(self.root, *row['path'].split('/')) for row in rows]
+
+    def lineage(self, path):
+        """Chain of files from `path` back to its original recording."""
+        chain = []
+        current = self._relative(path)
+        while current and current not in chain:
+            chain.append(current)
+            row = self.connection.execute("SELECT parent_path FROM sessions WHERE path = ?", (current,)).fetchone()
+            current = row['parent_path'] if row else None
+        return chain
+
+
+def resolve_session_files(paths, where=None, db_path=DEFAULT_DB):
+    """
+    Session files for a script's command line: explicit paths / directories, or a catalogue query.
+
+    Parameters:
+    - paths: CSV files or directories (used when `where` is None).
+    - where: parse_query() string evaluated against the catalogue at db_path.
+    """
+    if where is None:
+        return list_session_files(paths)
+    with SessionCatalog(db_path) as catalog:
+        return catalog.paths(where)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catalogue of recorded sessions")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Catalogue database")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Archive root containing Raw_data, Cleaned_data, ...")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan = commands.add_parser("scan", help="Index new and changed files")
+    scan.add_argument("dirs", nargs="*", default=list(ARCHIVE_DIRS), help="Folders under the root to index")
+    query = commands.add_parser("query", help="List sessions matching key=value terms")
+    query.add_argument("terms", nargs="*", help="e.g. exercise=Squat rate_hz=50 after=2025-04-01 kind=labeled")
+    query.add_argument("--paths", action="store_true", help="Only print file paths")
+    args = parser.parse_args()
+
+    with SessionCatalog(args.db, args.root) as catalog:
+        if args.command == "scan":
+            start = time.perf_counter()
+            updated, unchanged, removed = catalog.scan(args.dirs, verbose=True)
+            print(f"Indexed {updated} files ({unchanged} unchanged, {removed} removed) "
+                  f"in {time.perf_counter() - start:.1f}s")
+        elif args.paths:
+            print('\n'.join(catalog.paths(' '.join(args.terms))))
+        else:
+            with pd.option_context('display.width', 200, 'display.max_columns', 12):
+                print(catalog.query(' '.join(args.terms))[
+                    ['path', 'kind', 'exercise', 'rate_hz', 'recorded_at', 'duration_s', 'sample_count',
+                     'rep_count', 'set_count', 'detector_reps', 'parent_path']].to_string(index=False))
@@ -0,0 +1,356 @@
+import io
+import os
+import re
+import gzip
+import numpy as np
+import pandas as pd
+
+# Shared readers for the recording archive (Raw_data, Cleaned_data, Labeled_data).
+# Raw files start with an "Accelerometer Data" title line and may end with a blank line followed by a
+# "Reps and Sets Summary" section; cleaned and labeled files start directly with the Timestamp header.
+
+HEADER_PREFIX = "Timestamp,X,Y,Z"
+
+# Column layout of labeled sessions, as expected by the Edge Impulse CSV uploader
+LABELED_COLUMNS = ['Timestamp', 'X', 'Y', 'Z', 'Label', 'Exercise', 'Rep_Number', 'Set_Number']
+
+# e.g. "Squats3_50Hz _2025-04-06T17-32-24.883717_labeled.csv", "bicepCurl4_2025-03-30T14-54-25.198210.csv"
+_SESSION_NAME = re.compile(
+    r"^(?P<exercise>[A-Za-z]+?)(?P<take>\d*)(?:_(?P<rate>\d+)Hz)?\s*_(?P<timestamp>\d{4}-\d{2}-\d{2}T[\d\-.]+?)"
+    r"(?P<suffix>(?:_[a-z]+)*)\.csv$")
+
+
+def parse_session_filename(path):
+    """
+    Splits an archive file name into its metadata.
+
+    Returns:
+    - dict with 'exercise', 'take' (int or None), 'rate_hz' (int or None), 'recorded_at' (Timestamp or None)
+      and 'suffix' (e.g. '_cleaned', '_labeled', '' for raw), or None if the name does not match.
+    """
+    match = _SESSION_NAME.match(os.path.basename(path))
+    if match is None:
+        return None
+    date, _, clock = match.group("timestamp").partition("T")
+    hh, mm, ss = clock.split("-", 2)
+    return {
+        "exercise": match.group("exercise"),
+        "take": int(match.group("take")) if match.group("take") else None,
+        "rate_hz": int(match.group("rate")) if match.group("rate") else None,
+        "recorded_at": pd.Timestamp(f"{date}T{hh}:{mm}:{ss}"),
+        "suffix": match.group("suffix"),
+    }
+
+
+DERIVED_SUFFIXES = ('_cleaned', '_labeled', '_fixed')
+
+
+def session_stem(path):
+    """
+    File name of the original recording behind path, without derived suffixes or extension, e.g.
+    "bicepCurl1_50Hz_2025-04-06T14-03-38.353847_labeled_cleaned.csv" -> "bicepCurl1_50Hz_2025-04-06T14-03-38.353847".
+    """
+    name = os.path.basename(path)
+    meta = parse_session_filename(name)
+    stem = os.path.splitext(name)[0]
+    if meta is not None:
+        return stem[:len(stem) - len(meta['suffix'])]
+    while stem.endswith(DERIVED_SUFFIXES):
+        stem = stem.rsplit('_', 1)[0]
+    return stem
+
+
+def exercise_from_filename(path, default="unknown"):
+    meta = parse_session_filename(path)
+    return meta["exercise"] if meta else default
+
+
+# File-name spellings -> exercise labels used by classifyExercise() in rep_tracker.ino
+CANONICAL_EXERCISES = {
+    'squat': 'Squat', 'squats': 'Squat',
+    'bicepcurl': 'BicepCurl', 'bicepcurltest': 'BicepCurl',
+    'barbellrows': 'BarbellRows', 'barbeleows': 'BarbellRows',
+    'deadlift': 'Deadlift',
+}
+
+
+def canonical_exercise(name, default='Unknown'):
+    """Maps a file-name spelling ('Squats', 'bicepCurl', 'barbeleows', ...) to the sketch's label ('Squat', ...)."""
+    return CANONICAL_EXERCISES.get((name or '').lower(), default)
+
+
+def read_session_csv(file_path, parse_dates=True):
+    """
+    Reads a Raw, Cleaned or Labeled session CSV.
+
+    Parameters:
+    - file_path: Path to the CSV.
+    - parse_dates: Convert 'Timestamp' to datetime (ISO 8601; unparseable values, e.g. spreadsheet-mangled
+      "24:37.0" times, become NaT).
+
+    Returns:
+    - DataFrame with the file's columns (at least Timestamp, X, Y, Z); title lines and any
+      trailing summary section are skipped.
+    """
+    with open(file_path, 'r') as f:
+        text = f.read()
+    return parse_session_text(text, parse_dates, file_path)
+
+
+def parse_session_text(text, parse_dates=True, file_path='<text>'):
+    """Same as read_session_csv, for the contents of a file already in memory."""
+    start = text.find(HEADER_PREFIX)
+    if start < 0:
+        raise ValueError(f"{file_path}: no '{HEADER_PREFIX}' header found")
+    end = text.find("\n\n", start)
+    if end < 0:
+        end = text.find("\n\r\n", start)
+    body = text[start:end if end >= 0 else len(text)]
+
+    df = pd.read_csv(io.StringIO(body))
+    if parse_dates:
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='ISO8601', errors='coerce')
+    return df
+
+
+def list_session_files(paths):
+    """Expands a mix of CSV files and directories (searched non-recursively) into a sorted list of CSVs."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in os.listdir(path) if name.endswith('.csv')]
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+# Fast CSV writer
+#
+# Every column is turned into an object array of strings with lookup tables instead of per-value formatting:
+# floats with few decimals and small integers index a table covering their [min, max] range (sensor values have
+# two decimals, so the table stays small), strings are factorized, and timestamps are split into whole seconds
+# (formatted once per distinct second) plus a sub-second part built from 3-digit tables.
+# By default nothing is lost: floats are written as their shortest round-trip repr and timestamps keep
+# nanoseconds when they have them, as DataFrame.to_csv does.
+
+_MAX_TABLE_SIZE = 1_000_000  # Wider value ranges fall back to per-value formatting
+_MAX_EXACT_DECIMALS = 6  # Floats needing more decimals are formatted per value
+_DIGITS3 = np.array([f"{v:03d}" for v in range(1000)], dtype=object)
+
+
+def _format_table(values, make_table, fallback):
+    """Indexes a string table over [min, max] of an int64 array, or formats per value if the range is too wide."""
+    lo, hi = int(values.min()), int(values.max())
+    if hi - lo >= _MAX_TABLE_SIZE:
+        return np.array([fallback(v) for v in values.tolist()], dtype=object)
+    return make_table(lo, hi)[values - lo]
+
+
+def _exact_decimals(x):
+    """Fewest decimals (up to _MAX_EXACT_DECIMALS) that represent every value of x exactly, or None."""
+    for decimals in range(_MAX_EXACT_DECIMALS + 1):
+        scale = 10 ** decimals
+        if (np.rint(x * scale) / scale == x).all():
+            return decimals
+    return None
+
+
+def _format_float_column(x, precision):
+    x = np.asarray(x, dtype=np.float64)
+    missing = ~np.isfinite(x)
+    finite = np.where(missing, 0.0, x)
+    if precision is None:
+        # Source precision: repr(v / scale) is repr(x) whenever v / scale == x exactly
+        decimals = _exact_decimals(finite)
+        if decimals is None or np.abs(finite).max(initial=0.0) * 10 ** decimals >= 2 ** 62:
+            out = np.array([repr(v) for v in finite.tolist()], dtype=object)
+        else:
+            scale = 10 ** decimals
+            out = _format_table(np.rint(finite * scale).astype(np.int64),
+                                lambda lo, hi: np.array([repr(v / scale) for v in range(lo, hi + 1)], dtype=object),
+                                lambda v: repr(v / scale))
+            negative_zero = np.signbit(finite) & (finite == 0)
+            if negative_zero.any():
+                out[negative_zero] = '-0.0'
+    else:
+        scale = 10 ** precision
+        scaled = np.rint(finite * scale).astype(np.int64)
+        fmt = f"%.{precision}f"
+        out = _format_table(scaled,
+                            lambda lo, hi: np.array([fmt % (v / scale) for v in range(lo, hi + 1)], dtype=object),
+                            lambda v: fmt % (v / scale))
+    if missing.any():
+        out[missing] = ''
+    return out
+
+
+def _format_int_column(values):
+    values = np.asarray(values, dtype=np.int64)
+    return _format_table(values,
+                         lambda lo, hi: np.array([str(v) for v in range(lo, hi + 1)], dtype=object),
+                         str)
+
+
+def _timestamp_digits(timestamps):
+    """Fraction digits DataFrame.to_csv uses: 0 if all are whole seconds, 9 if any has nanoseconds, else 6."""
+    ns = np.asarray(timestamps, dtype='datetime64[ns]')
+    ns = ns[~np.isnat(ns)].astype(np.int64)
+    if not (ns % 1_000_000_000).any():
+        return 0
+    return 9 if (ns % 1000).any() else 6
+
+
+def _format_datetime_column(timestamps, sep, digits=None):
+    ns = np.asarray(timestamps, dtype='datetime64[ns]')
+    if digits is None:
+        digits = _timestamp_digits(ns)
+    missing = np.isnat(ns)
+    ns = np.where(missing, np.datetime64(0, 'ns'), ns).astype(np.int64)
+    seconds = ns // 1_000_000_000
+    fraction = ns - seconds * 1_000_000_000
+    unique_seconds, inverse = np.unique(seconds, return_inverse=True)
+    dot = '.' if digits else ''
+    prefixes = np.array([text.replace('T', sep) + dot for text in
+                         np.datetime_as_string(unique_seconds.astype('datetime64[s]'), unit='s')], dtype=object)
+    out = prefixes[inverse.ravel()]
+    if digits:
+        out = out + _DIGITS3[fraction // 1_000_000] + _DIGITS3[fraction // 1000 % 1000]
+        if digits == 9:
+            out = out + _DIGITS3[fraction % 1000]
+    if missing.any():
+        out[missing] = ''
+    return out
+
+
+def _format_column(series, precision, sep):
+    # precision: decimals (None = source precision) for floats, fraction digits (None = per chunk) for timestamps
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        # Rare (old *_fixed files); formatted per value to keep the UTC offset, as DataFrame.to_csv does
+        return np.array(['' if pd.isna(t) else str(t).replace(' ', sep, 1) for t in series], dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return _format_datetime_column(series.to_numpy(), sep, precision)
+    if pd.api.types.is_bool_dtype(series):
+        return np.where(series.to_numpy(), 'True', 'False').astype(object)
+    if pd.api.types.is_integer_dtype(series) and not series.isna().any():
+        return _format_int_column(series.to_numpy())
+    if pd.api.types.is_float_dtype(series):
+        return _format_float_column(series.to_numpy(), precision)
+    codes, uniques = pd.factorize(series)
+    table = np.array([str(u) for u in uniques] + [''], dtype=object)  # code -1 (missing) maps to ''
+    return table[codes]
+
+
+def _open_output(output_file, compression):
+    if compression == 'infer':
+        compression = {'.gz': 'gzip', '.zst': 'zstd'}.get(os.path.splitext(output_file)[1])
+    if compression == 'gzip':
+        return gzip.open(output_file, 'wt', compresslevel=1, newline='')  # favour speed over ratio
+    if compression == 'zstd':
+        import zstandard  # optional dependency, only needed for .zst output
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=3).stream_writer(open(output_file, 'wb')), newline='')
+    if compression is None:
+        return open(output_file, 'w', newline='')
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def write_labeled_csv(df, output_file, columns=LABELED_COLUMNS, float_precision=None, compression='infer',
+                      chunk_size=200_000, timestamp_sep=' '):
+    """
+    Writes session data as CSV, formatting each chunk column-wise and streaming it to disk.
+
+    Parameters:
+    - df: DataFrame containing `columns`, or an iterable of such DataFrames written one after another.
+    - output_file: Destination path.
+    - columns: Columns to write, in order (default: the labeled layout Timestamp,X,Y,Z,Label,Exercise,Rep_Number,Set_Number).
+    - float_precision: None (default) writes floats at full precision (shortest round-trip repr, as
+      DataFrame.to_csv); an int rounds every float column to that many decimals, a dict {column: decimals}
+      only the listed columns (others at full precision). Timestamps are never truncated: as with
+      DataFrame.to_csv they get microseconds, or nanoseconds if any value has them (decided over the whole
+      DataFrame, or per chunk when df is an iterable).
+    - compression: 'infer' (from a .gz / .zst extension), 'gzip', 'zstd' (requires zstandard) or None.
+    - chunk_size: Rows formatted per chunk (when df is a single DataFrame).
+    - timestamp_sep: Separator between date and time (' ' like DataFrame.to_csv, 'T' like the raw exports).
+    """
+    with _open_output(output_file, compression) as f:
+        f.write(','.join(columns) + '\n')
+        chunks = df
+        timestamp_digits = {}
+        if isinstance(df, pd.DataFrame):
+            chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+            timestamp_digits = {column: _timestamp_digits(df[column].to_numpy()) for column in columns
+                                if pd.api.types.is_datetime64_dtype(df[column])}
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            formatted = []
+            for column in columns:
+                if column in timestamp_digits:
+                    precision = timestamp_digits[column]
+                elif isinstance(float_precision, dict):
+                    precision = float_precision.get(column)
+                else:
+                    precision = float_precision
+                formatted.append(_format_column(chunk[column], precision, timestamp_sep).tolist())
+            f.write('\n'.join(map(','.join, zip(*formatted))))
+            f.write('\n')
+
+
+if __name__ == "__main__":
+    # Self-checks of write_labeled_csv:
+    #   python session_io.py [labeled CSVs or directories]   # default: Labeled_data next to this file
+    # A single DataFrame (several chunks) and the same rows as an iterable of DataFrames must both match
+    # DataFrame.to_csv, and rewriting existing labeled CSVs must reproduce them byte for byte.
+    import sys
+    import glob
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    n = 1000
+    sample = pd.DataFrame({
+        'Timestamp': (pd.Timestamp('2025-04-06 14:03:38.353847')
+                      + pd.to_timedelta(np.arange(n) * 20_000, unit='us')).astype('datetime64[ns]'),
+        'X': rng.integers(-2000, 2000, n) / 100,
+        'Y': rng.integers(-2000, 2000, n) / 100,
+        'Z': rng.integers(-2000, 2000, n) / 100,
+        'Label': rng.choice(['rep', 'no_rep'], n),
+        'Exercise': 'bicepCurl',
+        'Rep_Number': rng.integers(0, 12, n),
+        'Set_Number': rng.integers(0, 4, n),
+        'Time_Sec': np.arange(n) * 0.020001 + rng.random(n) * 1e-9,
+    })
+    sample.loc[5, 'X'] = -0.0
+    sample.loc[7, 'Timestamp'] += pd.Timedelta(123, unit='ns')
+    with tempfile.TemporaryDirectory() as directory:
+        output_file = os.path.join(directory, 'labeled.csv')
+        pieces = [sample.iloc[:300], sample.iloc[300:]]  # only the first has a nanosecond timestamp
+        for columns in (LABELED_COLUMNS, LABELED_COLUMNS + ['Time_Sec']):
+            # Timestamp fraction digits are decided per chunk of an iterable, like separate to_csv calls
+            chunked = (pieces[0].to_csv(index=False, columns=columns)
+                       + pieces[1].to_csv(index=False, columns=columns, header=False))
+            for name, data, expected in (('DataFrame', sample, sample.to_csv(index=False, columns=columns)),
+                                         ('chunks', pieces, chunked)):
+                write_labeled_csv(data, output_file, columns=columns, chunk_size=256)
+                with open(output_file, 'r', newline='') as f:
+                    assert f.read() == expected, f"write_labeled_csv({name}, {columns}) differs from DataFrame.to_csv"
+        print("write_labeled_csv: DataFrame and chunked input match DataFrame.to_csv")
+
+        paths = sys.argv[1:] or [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Labeled_data')]
+        files = [p for path in paths for p in (sorted(glob.glob(os.path.join(path, '*.csv')))
+                                               if os.path.isdir(path) else [path])]
+        checked = 0
+        for file_path in files:
+            df = pd.read_csv(file_path, float_precision='round_trip')
+            try:
+                df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='ISO8601')
+            except (KeyError, ValueError):  # raw export, or re-saved from a spreadsheet: not written by pandas
+                print(f"  skipped {file_path}: no ISO 8601 Timestamp column")
+                continue
+            write_labeled_csv(df, output_file, columns=list(df.columns))
+            with open(file_path, 'r', newline='') as original, open(output_file, 'r', newline='') as rewritten:
+                original, rewritten = original.read(), rewritten.read()
+            if original != rewritten and original != df.to_csv(index=False):  # e.g. *_cleaned: raw export timestamps
+                print(f"  skipped {file_path}: not written by DataFrame.to_csv")
+                continue
+            assert original == rewritten, f"rewriting {file_path} changed its contents"
+            checked += 1
+        print(f"write_labeled_csv: {checked} labeled CSVs rewritten byte for byte")
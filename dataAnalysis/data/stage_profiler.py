@@ -0,0 +1,240 @@
+import os
+import sys
+import csv
+import time
+import atexit
+import functools
+import threading
+
+# Lightweight per-stage instrumentation for the analysis scripts.
+#
+# Enable with the REPTRACKER_PROFILE=1 environment variable (or enable() / a --profile flag).
+# When disabled, stage() returns a shared no-op object, so instrumented code costs one global lookup.
+# At exit the collected stages are written to <prefix>_stages.csv (one row per stage) and
+# <prefix>.folded (folded stacks, e.g. for flamegraph.pl or speedscope), with the prefix taken from
+# REPTRACKER_PROFILE_OUT (default "profile").
+# Each thread has its own stage stack; stages of worker threads are reported under the thread's name
+# (e.g. "ThreadPoolExecutor-0_1;read_file"), stages of the main thread at the top level.
+# process_peak_rss_kb is the peak RSS of the whole process (all threads) seen when the stage last ended; it never
+# decreases, so a jump between consecutive stages points at the allocating stage, but it is not that stage's usage.
+
+PROFILE_ENV = "REPTRACKER_PROFILE"
+PROFILE_OUT_ENV = "REPTRACKER_PROFILE_OUT"
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_enabled = False
+_output_prefix = None
+_atexit_registered = False
+_local = threading.local()  # .stack: names of the thread's currently open stages
+_stats = {}  # stage path (tuple of names) -> _StageStats
+_stats_lock = threading.Lock()
+
+
+class _StageStats:
+    __slots__ = ("calls", "total", "child", "samples", "bytes_read", "process_peak_rss_kb")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.child = 0.0
+        self.samples = 0
+        self.bytes_read = 0
+        self.process_peak_rss_kb = None
+
+
+def _thread_stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        thread = threading.current_thread()
+        stack = _local.stack = [] if thread is threading.main_thread() else [thread.name]
+    return stack
+
+
+def _process_peak_rss_kb():
+    """Peak resident set size of the process so far, in KiB (None if unavailable)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) // 1024
+    except ImportError:
+        return None
+
+
+class _Stage:
+    __slots__ = ("path", "samples", "bytes_read", "start")
+
+    def __init__(self, name, samples, bytes_read):
+        self.path = tuple(_thread_stack()) + (name,)
+        self.samples = samples or 0
+        self.bytes_read = bytes_read or 0
+
+    def add(self, samples=0, bytes_read=0):
+        self.samples += samples
+        self.bytes_read += bytes_read
+
+    def __enter__(self):
+        _thread_stack().append(self.path[-1])
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        _thread_stack().pop()
+        process_peak_rss_kb = _process_peak_rss_kb()
+        with _stats_lock:
+            stats = _stats.get(self.path)
+            if stats is None:
+                stats = _stats[self.path] = _StageStats()
+            stats.calls += 1
+            stats.total += elapsed
+            stats.samples += self.samples
+            stats.bytes_read += self.bytes_read
+            stats.process_peak_rss_kb = process_peak_rss_kb
+            if len(self.path) > 1:
+                parent = _stats.get(self.path[:-1])
+                if parent is None:
+                    parent = _stats[self.path[:-1]] = _StageStats()
+                parent.child += elapsed
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def add(self, samples=0, bytes_read=0):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def enable(output_prefix=None):
+    """
+    Turns profiling on and writes the report at interpreter exit.
+
+    Parameters:
+    - output_prefix: Prefix for the <prefix>_stages.csv and <prefix>.folded files
+      (default: $REPTRACKER_PROFILE_OUT or "profile"). Pass "" to only collect in memory.
+    """
+    global _enabled, _output_prefix, _atexit_registered
+    if output_prefix is None:
+        output_prefix = os.environ.get(PROFILE_OUT_ENV, "profile")
+    if output_prefix and not _atexit_registered:
+        atexit.register(_dump_at_exit)
+        _atexit_registered = True
+    _enabled = True
+    _output_prefix = output_prefix
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    _stats.clear()
+
+
+def stage(name, samples=None, bytes_read=None):
+    """
+    Context manager timing one pipeline stage. Stages nest; the CSV reports total and self time.
+
+    Parameters:
+    - name: Stage name (e.g. 'read_csv', 'resample', 'butter').
+    - samples: Number of samples processed by the stage (can also be added later via .add()).
+    - bytes_read: Number of bytes read from disk by the stage.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, samples, bytes_read)
+
+
+def profiled(name=None):
+    """Decorator timing every call of a function as a stage (named after the function by default)."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(stage_name, None, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def report():
+    """
+    Returns the collected stages as a list of dicts, in first-seen order.
+
+    Keys: stage (';'-joined path), calls, total_s, self_s, mean_s, samples, bytes_read, process_peak_rss_kb
+    (process-wide peak RSS when the stage last ended, not the stage's own memory use).
+    """
+    rows = []
+    with _stats_lock:
+        items = list(_stats.items())
+    for path, stats in items:
+        if stats.calls == 0:
+            continue
+        rows.append({
+            "stage": ";".join(path),
+            "calls": stats.calls,
+            "total_s": stats.total,
+            "self_s": max(stats.total - stats.child, 0.0),
+            "mean_s": stats.total / stats.calls,
+            "samples": stats.samples,
+            "bytes_read": stats.bytes_read,
+            "process_peak_rss_kb": stats.process_peak_rss_kb,
+        })
+    return rows
+
+
+def write_stage_csv(output_file):
+    rows = report()
+    with open(output_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["stage", "calls", "total_s", "self_s", "mean_s",
+                                               "samples", "bytes_read", "process_peak_rss_kb"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_folded(output_file):
+    """Writes folded stacks ('a;b;c <self time in microseconds>'), the input format of flamegraph.pl."""
+    with open(output_file, "w") as f:
+        for row in report():
+            micros = int(round(row["self_s"] * 1e6))
+            if micros > 0:
+                f.write(f"{row['stage']} {micros}\n")
+
+
+def dump(output_prefix):
+    write_stage_csv(f"{output_prefix}_stages.csv")
+    write_folded(f"{output_prefix}.folded")
+    print(f"Stage profile saved to {output_prefix}_stages.csv and {output_prefix}.folded", file=sys.stderr)
+
+
+def _dump_at_exit():
+    if _enabled and _output_prefix and _stats:
+        dump(_output_prefix)
+
+
+if os.environ.get(PROFILE_ENV, "") not in ("", "0"):
+    enable()